@@ -4,20 +4,50 @@ __all__ = ["index", "modules", "custom_doc_links", "git_url"]
 
 index = {"Config": "00_core.ipynb",
          "URLs": "00_core.ipynb",
+         "stage": "00_core.ipynb",
+         "add_sink": "00_core.ipynb",
+         "remove_sink": "00_core.ipynb",
+         "instrument": "00_core.ipynb",
+         "MemorySink": "00_core.ipynb",
+         "LogSink": "00_core.ipynb",
+         "JsonLinesSink": "00_core.ipynb",
          "download_url": "00_core.ipynb",
          "download_data": "00_core.ipynb",
          "file_extract": "00_core.ipynb",
          "untar_data": "00_core.ipynb",
+         "untar_all": "00_core.ipynb",
+         "normalize_df": "00_core.ipynb",
+         "iter_df": "00_core.ipynb",
          "make_df": "00_core.ipynb",
          "delegates": "00_core.ipynb",
+         "court_image": "00_core.ipynb",
+         "shooting_table": "00_core.ipynb",
+         "court_zones": "00_core.ipynb",
+         "court_zone_table": "00_core.ipynb",
+         "hex_cells": "00_core.ipynb",
+         "hex_centers": "00_core.ipynb",
+         "hex_counts": "00_core.ipynb",
+         "ShotGrid": "00_core.ipynb",
          "Shots": "00_core.ipynb",
          "list_teams": "00_core.ipynb",
+         "ShotIndex": "00_core.ipynb",
+         "season_index": "00_core.ipynb",
          "list_game_ids": "00_core.ipynb",
          "TeamShots": "00_core.ipynb",
          "list_team_players": "00_core.ipynb",
-         "PlayerShots": "00_core.ipynb"}
+         "PlayerShots": "00_core.ipynb",
+         "ShotComparison": "00_core.ipynb",
+         "ShotDataset": "00_core.ipynb",
+         "SeasonStore": "00_core.ipynb",
+         "render_charts": "00_core.ipynb",
+         "ChartServer": "00_core.ipynb",
+         "serve_charts": "00_core.ipynb",
+         "synthetic_shots": "01_benchmark.ipynb",
+         "run_benchmarks": "01_benchmark.ipynb",
+         "benchmark_df": "01_benchmark.ipynb",
+         "compare_benchmarks": "01_benchmark.ipynb"}
 
-modules = ["core.py"]
+modules = ["core.py", "benchmark.py"]
 
 doc_url = "https://theccalderon.github.io/shot_chart/"
 
@@ -0,0 +1,147 @@
+# AUTOGENERATED! DO NOT EDIT! File to edit: 01_benchmark.ipynb (unless otherwise specified).
+
+__all__ = ['synthetic_shots', 'run_benchmarks', 'benchmark_df', 'compare_benchmarks']
+
+# Cell
+from .core import *
+from . import core
+import json, os, platform, shutil, statistics, tempfile, time, tracemalloc
+from io import BytesIO
+from pathlib import Path
+from typing import Collection, Optional
+import matplotlib
+import numpy as np
+import pandas as pd
+
+# Cell
+_ORDINALS = np.array(['1st', '2nd', '3rd', '4th'])
+
+def synthetic_shots(n_games:int=1230, shots_per_game:int=170, n_teams:int=30, players_per_team:int=15, season:int=2019, seed:int=0):
+    "Random shots of `n_games` games, 1230 per season from `season` on, in the format of the season csv files"
+    rng = np.random.RandomState(seed)
+    teams = np.array([f'Team {i:02d}' for i in range(n_teams)])
+    home = rng.randint(n_teams, size=n_games)
+    away = (home + 1 + rng.randint(n_teams - 1, size=n_games)) % n_teams
+    games = np.arange(n_games)
+    dates = pd.to_datetime([f'{season + g//1230}-10-22' for g in games]) + pd.to_timedelta((games % 1230)*170//1230, unit='D')
+    game_ids = np.array([f'{d:%Y%m%d}{g:04d}T{h:02d}' for d,g,h in zip(dates, games, home)])
+    n = n_games*shots_per_game
+    game = np.repeat(games, shots_per_game)
+    team = np.where(rng.randint(2, size=n) == 1, home[game], away[game])
+    player = team*players_per_team + rng.randint(players_per_team, size=n)
+    kind = rng.choice(3, size=n, p=[.35, .3, .35])
+    feet = np.where(kind == 0, rng.exponential(2.5, n), np.where(kind == 1, rng.uniform(5, 22, n), rng.uniform(22.5, 28, n)))
+    angle = rng.uniform(0, np.pi, n)
+    x = np.clip(np.round(35 + 10*feet*np.sin(angle)), 0, 470).astype(int)
+    y = np.clip(np.round(240 + 10*feet*np.cos(angle)), 0, 500).astype(int)
+    r = np.hypot(x - 35, y - 240)
+    three = (r >= 237.5) | (np.abs(y - 240) >= 220)
+    made = rng.rand(n) < np.clip(.62 - .012*r/10, .3, .7)
+    step = np.arange(n) % shots_per_game
+    quarter = 1 + 4*step // shots_per_game
+    remaining = 720 - (4*step % shots_per_game)*720 // shots_per_game
+    clock = pd.Series(remaining // 60).astype(str) + ':' + pd.Series(remaining % 60).map('{:04.1f}'.format)
+    df = pd.DataFrame({'game_id': game_ids[game], 'year': dates.year[game], 'month': dates.month[game], 'day': dates.day[game]})
+    points = pd.Series(made*(2 + three), index=df.index)
+    home_points = points.where(team == home[game], 0).groupby(game).cumsum().to_numpy()
+    away_points = points.where(team != home[game], 0).groupby(game).cumsum().to_numpy()
+    final = pd.DataFrame({'h': home_points, 'a': away_points}).groupby(game).transform('last')
+    home_won = (final['h'] >= final['a']).to_numpy()
+    df['winner'] = teams[np.where(home_won, home[game], away[game])]
+    df['loser'] = teams[np.where(home_won, away[game], home[game])]
+    df['x'] = pd.Series(x).astype(str) + 'px'
+    df['y'] = pd.Series(y).astype(str) + 'px'
+    shots_by = pd.Series(teams[team]).str.replace('Team', 'Player', regex=False) + pd.Series(player % players_per_team).map('-{:02d}'.format)
+    attempt = pd.Series(np.where(three, '3-pointer', '2-pointer'))
+    distance = pd.Series(np.round(r/10).astype(int)).astype(str)
+    df['play'] = (pd.Series(_ORDINALS[quarter - 1]) + ' quarter, ' + clock + ' remaining<br>' + shots_by
+                  + pd.Series(np.where(made, ' makes ', ' misses ')) + attempt + ' from ' + distance + ' ft')
+    df['time_remaining'] = clock
+    df['quarter'] = quarter
+    df['shots_by'] = shots_by
+    df['outcome'] = np.where(made, 'made', 'missed')
+    df['attempt'] = attempt
+    df['distance'] = distance + 'ft'
+    df['team'] = teams[team]
+    df['winner_score'] = np.where(home_won, home_points, away_points)
+    df['loser_score'] = np.where(home_won, away_points, home_points)
+    return df
+
+# Cell
+SCALES = {'game': 1, 'month': 200, 'season': 1230, 'seasons': 3*1230}
+
+def _measure(f, repeat:int=3, setup=None):
+    times = []
+    for _ in range(repeat):
+        if setup: setup()
+        start = time.perf_counter()
+        f()
+        times.append(time.perf_counter() - start)
+    if setup: setup()
+    tracemalloc.start()
+    try:
+        f()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally: tracemalloc.stop()
+    return {'min_s': min(times), 'median_s': statistics.median(times), 'peak_bytes': peak}
+
+def _png(fig):
+    fig.savefig(BytesIO(), format='png')
+
+def _stages(path):
+    "Name, function and setup of the stages run on the season csv at `path`"
+    df = make_df(path)
+    team = df['team'].iloc[0]
+    player = df.loc[df['team'] == team, 'shots_by'].iloc[0]
+    teams,players = list_teams(df),df['shots_by'].unique()
+    return [('make_df_csv', lambda: make_df(path), lambda: shutil.rmtree(str(path.parent/(path.stem + '.cols')), ignore_errors=True)),
+            ('make_df_cache', lambda: make_df(path), None),
+            ('season_index', lambda: ShotIndex(df), None),
+            ('team_shots', lambda: [TeamShots(df, t) for t in teams], None),
+            ('player_shots', lambda: [PlayerShots(df, p) for p in players], None),
+            ('team_metrics', lambda: [(s.fg_pct, s.efg_pct, s.zone_table()) for s in (TeamShots(df, t) for t in teams)], None),
+            ('shooting_table', lambda: shooting_table(df), None),
+            ('shot_grid', lambda: ShotGrid.from_df(df, 'shots_by'), None),
+            ('render_shots', lambda: _png(TeamShots(df, team).shots_figure()), None),
+            ('render_player_shots', lambda: _png(PlayerShots(df, player).shots_figure()), None),
+            ('render_effective', lambda: _png(TeamShots(df, team).effective_figure()), None)]
+
+# Cell
+def _environment():
+    return {'python': platform.python_version(), 'platform': platform.platform(), 'numpy': np.__version__,
+            'pandas': pd.__version__, 'matplotlib': matplotlib.__version__}
+
+def run_benchmarks(scales:Collection[str]=tuple(SCALES), stages:Optional[Collection[str]]=None, repeat:int=3,
+                   out:Optional[str]=None, label:Optional[str]=None, seed:int=0):
+    "Times the stages (all by default) at each of `scales`, from `SCALES`, optionally writing the results as json to `out`"
+    results = []
+    court,core._COURT_IMG = core._COURT_IMG,False
+    tmp = Path(tempfile.mkdtemp(prefix='shot_chart_bench'))
+    try:
+        for scale in scales:
+            path = tmp/f'{scale}.csv'
+            synthetic_shots(n_games=SCALES[scale], seed=seed).to_csv(path)
+            for name,f,setup in _stages(path):
+                if stages is not None and name not in stages: continue
+                results.append({'scale': scale, 'stage': name, 'games': SCALES[scale], 'rows': len(make_df(path)),
+                                'csv_bytes': path.stat().st_size, 'repeat': repeat, **_measure(f, repeat, setup)})
+    finally:
+        core._COURT_IMG = court
+        shutil.rmtree(str(tmp), ignore_errors=True)
+    report = {'version': 1, 'label': label, 'created': time.strftime('%Y-%m-%dT%H:%M:%S'), 'environment': _environment(), 'results': results}
+    if out is not None: Path(out).write_text(json.dumps(report, indent=1))
+    return report
+
+def benchmark_df(report):
+    "The results of a `run_benchmarks` report, or of the json file it was saved to, as a dataframe"
+    if not isinstance(report, dict): report = json.loads(Path(report).read_text())
+    return pd.DataFrame(report['results'])
+
+def compare_benchmarks(before, after):
+    "Median times and peak memory of two reports side by side, with the ratio `after/before` of each"
+    keys = ['scale', 'stage']
+    df = benchmark_df(before)[keys + ['median_s', 'peak_bytes']].merge(
+         benchmark_df(after)[keys + ['median_s', 'peak_bytes']], on=keys, suffixes=('_before', '_after'))
+    df['time_ratio'] = (df['median_s_after']/df['median_s_before']).round(2)
+    df['memory_ratio'] = (df['peak_bytes_after']/df['peak_bytes_before']).round(2)
+    return df
\ No newline at end of file
@@ -1,42 +1,108 @@
 # AUTOGENERATED! DO NOT EDIT! File to edit: 00_core.ipynb (unless otherwise specified).
 
-__all__ = ['Config', 'URLs', 'download_url', 'download_data', 'file_extract', 'untar_data', 'make_df', 'delegates',
-           'Shots', 'list_teams', 'list_game_ids', 'TeamShots', 'list_team_players', 'PlayerShots']
+__all__ = ['Config', 'URLs', 'stage', 'add_sink', 'remove_sink', 'instrument', 'MemorySink', 'LogSink', 'JsonLinesSink',
+           'download_url', 'download_data', 'file_extract', 'untar_data', 'untar_all', 'normalize_df', 'iter_df',
+           'make_df', 'delegates', 'court_image', 'shooting_table', 'court_zones', 'court_zone_table', 'hex_cells',
+           'hex_centers', 'hex_counts', 'ShotGrid', 'Shots', 'list_teams', 'ShotIndex', 'season_index', 'list_game_ids',
+           'TeamShots', 'list_team_players', 'PlayerShots', 'ShotComparison', 'ShotDataset', 'SeasonStore',
+           'render_charts', 'ChartServer', 'serve_charts']
 
 # Cell
 from pathlib import Path
 import os
 import yaml
-import pandas as pd
-import requests
 import tarfile
-from fastprogress.fastprogress import master_bar, progress_bar
-import matplotlib.pyplot as plt
 from typing import Sequence, Tuple, TypeVar, Union
 from typing import Any, AnyStr, Callable, Collection, Dict, Hashable, Iterator, List, Mapping, NewType, Optional
-import boto3
 import hashlib
 import shutil
+import tempfile
+import weakref
 import numpy as np
 import inspect
+import copy
+import collections
+import json
+import re
+import datetime
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from urllib.parse import parse_qs, urlsplit
+from io import BytesIO
+from contextlib import contextmanager
+import functools
+import importlib
+import logging
+import threading
+import tracemalloc
+import zlib
+
+# Cell
+class _LazyModule:
+    "Stands in for the module `name`, imported the first time one of its attributes is used"
+    def __init__(self, name): self.__dict__.update(_name=name, _module=None)
+
+    def __getattr__(self, k):
+        if self._module is None: self.__dict__['_module'] = importlib.import_module(self._name)
+        try: return getattr(self._module, k)
+        except AttributeError: pass
+        try: return importlib.import_module(f'{self._name}.{k}')
+        except ImportError: raise AttributeError(k) from None
+
+    def __repr__(self): return f'<lazy module {self._name!r}>'
+
+# heavy dependencies, only imported when used so that importing `shot_chart` stays fast
+pd = _LazyModule('pandas')
+requests = _LazyModule('requests')
+boto3 = _LazyModule('boto3')
+matplotlib = _LazyModule('matplotlib')
+plt = _LazyModule('matplotlib.pyplot')
 
 # Cell
 class Config:
     config_path = Path(os.getenv('SHOTCHART_HOME', '~/.shot_chart')).expanduser()
     config_file = config_path/'config.yml'
+    settings = {'check_ttl': 24*60*60, 'offline': False}
+
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None: cls._instance = super().__new__(cls)
+        return cls._instance
 
     def __init__(self):
-        self.config_path.mkdir(parents=True, exist_ok=True)
-        if not self.config_file.exists(): self.create_config()
-        self.d = self.load_config()
+        "Loads `config_file` the first time, and again only when it changed since"
+        stamp = self._stamp()
+        if stamp is None:
+            self.config_path.mkdir(parents=True, exist_ok=True)
+            self.create_config()
+            stamp = self._stamp()
+        if self.__dict__.get('_loaded') != stamp:
+            self.d = self.load_config()
+            self._loaded = stamp
+
+    def _stamp(self):
+        try: st = os.stat(self.config_file)
+        except FileNotFoundError: return None
+        return st.st_mtime_ns, st.st_size
 
     def __getitem__(self,k):
         k = k.lower()
+        if k in self.settings: return self._setting(self.d.get(k, self.settings[k]), self.settings[k])
         if k not in self.d: k = k+'_path'
         if k in ["my_dpi","fig_height","fig_width"]:
             return self.d[k]
         return Path(self.d[k])
 
+    @staticmethod
+    def _setting(v, default):
+        "`v` as the type of `default`, parsing the strings stored by `__setitem__`"
+        if not isinstance(v, str): return type(default)(v)
+        if isinstance(default, bool): return v.strip().lower() in ('true', 'yes', 'on', '1')
+        return type(default)(float(v))
+
     def __getattr__(self,k):
         if k=='d': raise AttributeError
         return self[k]
@@ -47,26 +113,30 @@ class Config:
     def load_config(self):
         with open(self.config_file, 'r') as f:
             config = yaml.safe_load(f)
-            if 'version' in config and config['version'] == 1: return config
+            if config and 'version' in config and config['version'] == 1: return config
         self.create_config()
         return self.load_config()
 
     def create_config(self):
-        F = plt.gcf()
-        # Now check everything with the defaults:
-        DPI = F.get_dpi()
+        # the default figure DPI, without creating a figure
+        DPI = float(matplotlib.rcParams['figure.dpi'])
         config = {'data_path':    str(self.config_path/'data'),
                   'archive_path':    str(self.config_path/'archive'),
                   'version':      1,
                   'my_dpi': DPI,
                   'fig_height': 472,
-                  'fig_width': 500
+                  'fig_width': 500,
+                  'check_ttl': self.settings['check_ttl'],
+                  'offline': self.settings['offline']
                  }
         self.save_file(config)
 
     def save(self): self.save_file(self.d)
     def save_file(self, config):
-        with self.config_file.open('w') as f: yaml.dump(config, f, default_flow_style=False)
+        # write a temporary file and rename it so concurrent readers never see a partial config
+        fd,tmp = tempfile.mkstemp(dir=str(self.config_path), suffix='.yml')
+        with os.fdopen(fd, 'w') as f: yaml.dump(config, f, default_flow_style=False)
+        os.replace(tmp, str(self.config_file))
 
 # Cell
 class URLs():
@@ -95,6 +165,8 @@ class URLs():
     SHOTS_2018    = f'{S3}shots-2018.tgz'
     SHOTS_2019    = f'{S3}shots-2019.tgz'
 
+    COURT_IMG     = 'http://d2p3bygnnzw9w3.cloudfront.net/req/1/images/bbr/nbahalfcourt.png'
+
     def path(url, c_key='archive'):
         fname = url.split('/')[-1]
         local_path = URLs.LOCAL_PATH/('data' if c_key=='data' else 'archive')/fname
@@ -102,38 +174,165 @@ class URLs():
         return Config()[c_key]/fname
 
 # Cell
-def download_url(url, dest, overwrite=False, pbar=None, show_progress=True, chunk_size=1024*1024,
-                 timeout=4, retries=5):
-    "Download `url` to `dest` unless it exists and not `overwrite`"
-    if os.path.exists(dest) and not overwrite: return
+_SINKS = []
+_STAGES = threading.local()
+
+class _Stage:
+    "Records the time, and the peak memory if traced, of the code run inside it"
+    def __init__(self, name, info): self.name,self.record = name,dict(stage=name, **info)
+
+    def __enter__(self):
+        stack = _STAGES.__dict__.setdefault('stack', [])
+        self.record['parent'] = stack[-1].name if stack else None
+        self.traced = tracemalloc.is_tracing() and hasattr(tracemalloc, 'reset_peak')
+        if self.traced:
+            current,peak = tracemalloc.get_traced_memory()
+            for s in stack: s.peak = max(s.peak, peak)
+            tracemalloc.reset_peak()
+            self.start_memory = self.peak = current
+        stack.append(self)
+        self.record['start'] = time.time()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.record['seconds'] = time.perf_counter() - self.start
+        stack = _STAGES.stack
+        stack.pop()
+        if self.traced:
+            self.peak = max(self.peak, tracemalloc.get_traced_memory()[1])
+            if stack: stack[-1].peak = max(stack[-1].peak, self.peak)
+            self.record['peak_bytes'] = self.peak - self.start_memory
+        if exc_type is not None: self.record['error'] = exc_type.__name__
+        for sink in list(_SINKS): sink(self.record)
+
+class _NoStage:
+    record = {}
+    def __enter__(self): return self
+    def __exit__(self, *args): pass
 
+_NO_STAGE = _NoStage()
+
+def stage(name:str, **info):
+    "Context manager recording the code run inside it as the stage `name`, with the extra fields `info`, if there are sinks"
+    return _Stage(name, info) if _SINKS else _NO_STAGE
+
+def _note(**info):
+    "Adds `info` to the record of the innermost running stage"
+    if _SINKS and getattr(_STAGES, 'stack', None): _STAGES.stack[-1].record.update(info)
+
+def _instrumented(name):
+    "Decorator recording the calls of a function as the stage `name`"
+    def _f(f):
+        @functools.wraps(f)
+        def _inner(*args, **kwargs):
+            if not _SINKS: return f(*args, **kwargs)
+            with _Stage(name, {}): return f(*args, **kwargs)
+        return _inner
+    return _f
+
+# Cell
+def add_sink(sink):
+    "Sends the records of the finished stages to `sink`"
+    _SINKS.append(sink)
+    return sink
+
+def remove_sink(sink):
+    if sink in _SINKS: _SINKS.remove(sink)
+
+@contextmanager
+def instrument(*sinks, memory:bool=False):
+    "Sends the records of the stages run inside it to `sinks` (a new `MemorySink` if none), tracing their peak memory if `memory`"
+    sinks = sinks or (MemorySink(),)
+    trace = memory and not tracemalloc.is_tracing()
+    if trace: tracemalloc.start()
+    for sink in sinks: add_sink(sink)
+    try: yield sinks[0]
+    finally:
+        for sink in sinks: remove_sink(sink)
+        if trace: tracemalloc.stop()
+
+class MemorySink:
+    "Keeps the records of the stages in `records`"
+    def __init__(self): self.records = []
+    def __call__(self, record): self.records.append(record)
+    def df(self): return pd.DataFrame(self.records)
+
+class LogSink:
+    "Logs the records of the stages with `logger` at `level`"
+    def __init__(self, logger:str='shot_chart', level:int=logging.INFO): self.logger,self.level = logging.getLogger(logger),level
+    def __call__(self, record):
+        info = ' '.join(f'{k}={v}' for k,v in record.items() if k not in ('stage', 'seconds', 'start'))
+        self.logger.log(self.level, '%s %.4fs %s', record['stage'], record['seconds'], info)
+
+class JsonLinesSink:
+    "Appends the records of the stages to the file `fname`, one json object per line"
+    def __init__(self, fname): self.fname,self.lock = Path(fname),threading.Lock()
+    def __call__(self, record):
+        line = json.dumps(record, default=str) + '\n'
+        with self.lock, open(self.fname, 'a') as f: f.write(line)
+
+# Cell
+def _session(retries=5, pool_size=10):
     s = requests.Session()
-    s.mount('http://',requests.adapters.HTTPAdapter(max_retries=retries))
+    adapter = requests.adapters.HTTPAdapter(max_retries=retries, pool_connections=pool_size, pool_maxsize=pool_size)
+    s.mount('http://',adapter)
+    s.mount('https://',adapter)
     # additional line to identify as a firefox browser, see fastai/#2438
     s.headers.update({'User-Agent': 'Mozilla/5.0 (X11; Ubuntu; Linux x86_64; rv:71.0) Gecko/20100101 Firefox/71.0'})
-    u = s.get(url, stream=True, timeout=timeout)
-    try: file_size = int(u.headers["Content-Length"])
-    except: show_progress = False
+    return s
+
+def _if_range(dest):
+    "File keeping the ETag or Last-Modified date of the download to `dest`, sent as `If-Range` to resume it"
+    return Path(f'{dest}.if-range')
 
-    with open(dest, 'wb') as f:
-        nbytes = 0
-        if show_progress: pbar = progress_bar(range(file_size), leave=False, parent=pbar)
+@_instrumented('download')
+def download_url(url, dest, overwrite=False, pbar=None, show_progress=True, chunk_size=1024*1024,
+                 timeout=4, retries=5, session=None, resume=False):
+    "Download `url` to `dest` unless it exists and not `overwrite`, continuing a partial `dest` if `resume` and `url` didn't change since"
+    if os.path.exists(dest) and not overwrite and not resume: return True
+
+    s = session or _session(retries)
+    validator = _if_range(dest)
+    start = os.path.getsize(dest) if resume and os.path.exists(dest) and validator.exists() else 0
+    # with `If-Range` the server sends the whole file again if it changed since the first bytes of `dest`
+    headers = {'Range': f'bytes={start}-', 'If-Range': validator.read_text()} if start else {}
+    u = s.get(url, stream=True, timeout=timeout, headers=headers)
+    if start and u.status_code == 416: return True # `dest` is already complete
+    u.raise_for_status()
+    if u.status_code != 206: start = 0
+    if resume and not start:
+        tag = u.headers.get('ETag') or u.headers.get('Last-Modified')
+        if tag: validator.write_text(tag)
+        elif validator.exists(): os.remove(validator)
+    try: file_size = start + int(u.headers["Content-Length"])
+    except: file_size,show_progress = None,False
+
+    with open(dest, 'ab' if start else 'wb') as f:
+        nbytes = start
+        if show_progress:
+            from fastprogress.fastprogress import progress_bar
+            pbar = progress_bar(range(file_size), leave=False, parent=pbar)
         try:
-            if show_progress: pbar.update(0)
+            if show_progress: pbar.update(nbytes)
             for chunk in u.iter_content(chunk_size=chunk_size):
                 nbytes += len(chunk)
                 if show_progress: pbar.update(nbytes)
                 f.write(chunk)
-        except requests.exceptions.ConnectionError as e:
-            fname = url.split('/')[-1]
-            data_dir = dest.parent
-            print(f'\n Download of {url} has failed after {retries} retries\n'
-                  f' Fix the download manually:\n'
-                  f'$ mkdir -p {data_dir}\n'
-                  f'$ cd {data_dir}\n'
-                  f'$ wget -c {url}\n'
-                  f'$ tar xf {fname}\n'
-                  f' And re-run your code once the download is successful\n')
+        except (requests.exceptions.ConnectionError, requests.exceptions.ChunkedEncodingError) as e:
+            # a resumable download is reported by the caller, which continues it on the next run
+            if not resume:
+                fname = url.split('/')[-1]
+                data_dir = dest.parent
+                print(f'\n Download of {url} has failed after {retries} retries\n'
+                      f' Fix the download manually:\n'
+                      f'$ mkdir -p {data_dir}\n'
+                      f'$ cd {data_dir}\n'
+                      f'$ wget -c {url}\n'
+                      f'$ tar xf {fname}\n'
+                      f' And re-run your code once the download is successful\n')
+    _note(url=url, nbytes=nbytes - start)
+    return file_size is None or nbytes == file_size
 
 # Cell
 def download_data(url, fname=None, c_key='archive', force_download=False):
@@ -144,47 +343,281 @@ def download_data(url, fname=None, c_key='archive', force_download=False):
     return fname
 
 # Cell
+@_instrumented('extract')
 def file_extract(fname, dest='.'):
     "Extract `fname` to `dest` using `tarfile` or `zipfile"
     fname = str(fname)
-    if   fname.endswith('gz'):  tarfile.open(fname, 'r:gz').extractall(dest)
+    _note(path=fname, nbytes=os.path.getsize(fname))
+    if   fname.endswith('gz'):  tarfile.open(fname, 'r|gz').extractall(dest)
     elif fname.endswith('zip'): zipfile.ZipFile(fname     ).extractall(dest)
     else: raise Exception(f'Unrecognized archive: {fname}')
 
 # Cell
+def _read_check(fname):
+    "Contents of the `.check` sidecar file of the archive `fname`"
+    try: return json.loads(Path(f'{fname}.check').read_text())
+    except (OSError, ValueError): return {}
+
+def _write_check(fname, check): Path(f'{fname}.check').write_text(json.dumps(check))
+
+def _file_md5(fname, chunk_size=1024*1024):
+    "MD5 of `fname` read in chunks, cached in its `.check` sidecar until its size or mtime change"
+    st,check = os.stat(fname),_read_check(fname)
+    if check.get('size') == st.st_size and check.get('mtime') == st.st_mtime_ns: return check['md5']
+    md5 = hashlib.md5()
+    with open(fname, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''): md5.update(chunk)
+    _write_check(fname, {'size': st.st_size, 'mtime': st.st_mtime_ns, 'md5': md5.hexdigest()})
+    return md5.hexdigest()
+
+@_instrumented('check')
 def _get_check(url):
+    "Whether the S3 ETag of `url` differs from the MD5 of the local archive, asking S3 at most once every `check_ttl` seconds"
+    fname = Path(URLs.path(url))
+    md5 = _file_md5(fname)
+    check,config = _read_check(fname),Config()
+    if config.offline or os.getenv('SHOTCHART_OFFLINE') or time.time() - check.get('checked', 0) < config.check_ttl:
+        return check.get('etag', md5) != md5
     s3 = boto3.client('s3')
     s3_resp = s3.head_object(Bucket=URLs.S3.split(".")[0].split("//")[1],Key=url.split("/")[-1])
-    ETag = s3_resp['ETag'].strip('"')
-    # Open,close, read file and calculate MD5 on its contents
-    with open(Path(URLs.path(url)),"rb") as file_to_check:
-        # read contents of the file
-        data = file_to_check.read()
-        # pipe contents of the file through
-        md5_returned = hashlib.md5(data).hexdigest()
-    return ETag != md5_returned
+    check.update(etag=s3_resp['ETag'].strip('"'), checked=time.time())
+    _note(url=url, remote=True)
+    _write_check(fname, check)
+    return check['etag'] != md5
 
 # Cell
+@_instrumented('untar_data')
 def untar_data(url, fname=None, dest=None, c_key='data', force_download=False, extract_func=file_extract):
     "Download `url` to `fname` if `dest` doesn't exist, and un-tgz to folder `dest`."
     default_dest = URLs.path(url, c_key=c_key).with_suffix('.csv')
     dest = default_dest if dest is None else Path(dest)/default_dest.name
     fname = Path(fname or URLs.path(url))
+    _note(url=url)
     if fname.exists() and _get_check(url):
         print("A new version of this dataset is available, downloading...")
         force_download = True
     if force_download:
         if fname.exists(): os.remove(fname)
+        if Path(f'{fname}.check').exists(): os.remove(f'{fname}.check')
         if dest.exists(): os.remove(dest)
+        if _cache_dir(dest).exists(): shutil.rmtree(_cache_dir(dest))
     if not dest.exists():
         fname = download_data(url, fname=fname, c_key=c_key)
         extract_func(fname, dest.parent)
     return dest
 
 # Cell
-def make_df(path):
-    "Creates a pandas dataframe from `path`"
-    return pd.read_csv(path)
+def _discard(*fnames):
+    for f in fnames:
+        if os.path.exists(f): os.remove(f)
+
+def _fetch(url, session, c_key='data'):
+    dest = URLs.path(url, c_key=c_key).with_suffix('.csv')
+    fname = URLs.path(url)
+    if not fname.exists():
+        fname.parent.mkdir(parents=True, exist_ok=True)
+        part = fname.with_name(fname.name+'.part')
+        if not download_url(url, part, session=session, resume=True, show_progress=False, chunk_size=64*1024):
+            raise IOError(f'Download of {url} was interrupted, run `untar_all` again to resume it')
+        validator = _if_range(part)
+        etag = validator.read_text().strip('"') if validator.exists() else ''
+        # the ETag of S3 is the MD5 of the archive, unless it was uploaded in parts
+        if re.fullmatch('[0-9a-f]{32}', etag) and _file_md5(part) != etag:
+            _discard(part, f'{part}.check', validator)
+            raise IOError(f'Download of {url} is corrupted, run `untar_all` again to download it again')
+        part.rename(fname)
+        if os.path.exists(f'{part}.check'): os.replace(f'{part}.check', f'{fname}.check')
+        _discard(validator)
+    if not dest.exists():
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        try: file_extract(fname, dest.parent)
+        except Exception:
+            # downloaded again by the next call rather than failing to extract forever
+            _discard(fname, f'{fname}.check', dest)
+            raise
+    return fname.name, {'url': url, 'size': fname.stat().st_size, 'md5': _file_md5(fname), 'csv': str(dest)}
+
+def _update_manifest(entries, c_key='data'):
+    manifest = Config()[c_key]/'manifest.json'
+    data = json.loads(manifest.read_text()) if manifest.exists() else {}
+    data.update(entries)
+    manifest.parent.mkdir(parents=True, exist_ok=True)
+    manifest.write_text(json.dumps(data, indent=1, sort_keys=True))
+
+# Cell
+def untar_all(seasons:Optional[Collection[int]]=None, urls:Optional[Collection[str]]=None, n_workers:int=4, c_key='data'):
+    "Downloads and extracts the `seasons` (all by default) or `urls` concurrently, returns the paths of the csv files"
+    if urls is None:
+        if seasons is None: seasons = sorted(int(k.split('_')[1]) for k in vars(URLs) if k.startswith('SHOTS_'))
+        urls = [getattr(URLs, f'SHOTS_{s}') for s in seasons]
+    session = _session(pool_size=n_workers)
+    with ThreadPoolExecutor(n_workers) as ex: futures = [ex.submit(_fetch, u, session, c_key) for u in urls]
+    _update_manifest(dict(f.result() for f in futures if f.exception() is None), c_key)
+    return [Path(f.result()[1]['csv']) for f in futures]
+
+# Cell
+_CACHE_VERSION = 4
+
+def _cache_dir(path):
+    "Directory holding the columnar cache of the csv at `path`"
+    path = Path(path)
+    return path.parent/(path.stem+'.cols')
+
+def _source_stamp(path):
+    st = os.stat(path)
+    return {'size': st.st_size, 'mtime': st.st_mtime_ns}
+
+def _compact_df(df):
+    "Converts the string columns of `df` to categoricals"
+    for c in df.columns:
+        if not pd.api.types.is_numeric_dtype(df[c]) and df[c].dtype.name != 'category': df[c] = df[c].astype('category')
+    return df
+
+def _cache_meta(cache, stamp):
+    "Parsed `meta.json` of `cache` if it is a complete cache of the current version of the source with `stamp`, else `None`"
+    try: meta = json.loads((cache/'meta.json').read_text())
+    except (OSError, ValueError): return None
+    if meta.get('version') != _CACHE_VERSION or meta.get('source') != stamp: return None
+    files = [f'{i}.npy' for i in range(len(meta['columns']))] + [f'{i}.categories.npy' for i,c in enumerate(meta['columns']) if 'categories' in c]
+    return meta if all((cache/f).exists() for f in files) else None
+
+def _write_meta(cache, meta):
+    "Replaces the `meta.json` of `cache` with `meta` at once, through a temporary file"
+    fd,tmp = tempfile.mkstemp(dir=str(cache), suffix='.json')
+    with os.fdopen(fd, 'w') as f: json.dump(meta, f)
+    os.replace(tmp, str(cache/'meta.json'))
+
+def _text_bytes(values):
+    "`values` as utf-8 text separated by NUL bytes, in a uint8 array"
+    text = '\0'.join(values)
+    if text.count('\0') != max(len(values) - 1, 0): raise ValueError('categories containing NUL bytes can not be cached')
+    return np.frombuffer(text.encode(), dtype=np.uint8)
+
+def _save_categories(fname, categories):
+    "Saves `categories` to the `.npy` file `fname`, strings as text, and returns how they were saved"
+    if pd.api.types.is_numeric_dtype(categories.dtype):
+        np.save(fname, categories.to_numpy())
+        return 'array'
+    np.save(fname, _text_bytes(categories))
+    return 'text'
+
+_CATEGORIES = {}
+
+def _file_stamp(fname):
+    st = os.stat(fname)
+    return st.st_mtime_ns, st.st_size
+
+def _load_categories(fname, kind):
+    "`CategoricalDtype` of the categories saved to `fname`, decoded once per version of the file"
+    stamp = _file_stamp(fname)
+    cached = _CATEGORIES.get(str(fname))
+    if cached is None or cached[0] != stamp:
+        values = np.load(fname)
+        if kind == 'text': values = values.tobytes().decode().split('\0') if len(values) else []
+        cached = _CATEGORIES[str(fname)] = (stamp, pd.CategoricalDtype(values))
+    return cached[1]
+
+@_instrumented('write_cache')
+def _write_cache(df, cache, stamp):
+    "Writes `df` to `cache`, one `.npy` file per column, and one more for the categories of categorical columns"
+    # every writer builds its own copy and moves it into place whole, so concurrent builds can't mix their files
+    tmp = Path(tempfile.mkdtemp(dir=str(cache.parent), prefix=cache.name+'.'))
+    try:
+        columns = []
+        for i,c in enumerate(df.columns):
+            if df[c].dtype.name == 'category':
+                np.save(tmp/f'{i}.npy', df[c].cat.codes.to_numpy())
+                columns.append({'name': c, 'categories': _save_categories(tmp/f'{i}.categories.npy', df[c].cat.categories)})
+            else:
+                np.save(tmp/f'{i}.npy', df[c].to_numpy())
+                columns.append({'name': c})
+        (tmp/'meta.json').write_text(json.dumps({'version': _CACHE_VERSION, 'source': stamp, 'rows': len(df), 'columns': columns}))
+        if cache.exists():
+            old = Path(tempfile.mkdtemp(dir=str(cache.parent), prefix=cache.name+'.'))
+            try: cache.rename(old/'stale')
+            except OSError: pass # moved away by another writer
+            shutil.rmtree(old, ignore_errors=True)
+        try: tmp.rename(cache)
+        except OSError: return # another writer put its copy in place first
+    finally:
+        if tmp.exists(): shutil.rmtree(tmp, ignore_errors=True)
+    for i,c in enumerate(df.columns):
+        fname = cache/f'{i}.categories.npy'
+        if df[c].dtype.name != 'category': continue
+        try: _CATEGORIES[str(fname)] = (_file_stamp(fname), df[c].dtype)
+        except OSError: pass # replaced by another writer already, decoded again on the next read
+
+@_instrumented('read_cache')
+def _read_cache(cache, columns=None, meta=None):
+    "Memory-maps the first `meta['rows']` rows of the columns of `cache` into a dataframe, optionally only `columns`, given its parsed `meta` if already read"
+    if meta is None: meta = json.loads((cache/'meta.json').read_text())
+    data = {}
+    for i,c in enumerate(meta['columns']):
+        if columns is not None and c['name'] not in columns: continue
+        arr = np.load(cache/f'{i}.npy', mmap_mode='c')[:meta['rows']]
+        if 'categories' in c: arr = pd.Categorical.from_codes(arr, dtype=_load_categories(cache/f'{i}.categories.npy', c['categories']))
+        data[c['name']] = arr
+    df = pd.DataFrame(data, columns=columns or [c['name'] for c in meta['columns']], copy=False)
+    _note(rows=len(df), nbytes=sum(np.asarray(v).nbytes if not hasattr(v, 'codes') else v.codes.nbytes for v in data.values()))
+    return df
+
+# Cell
+def _parse_units(s, unit):
+    "Parses strings like `'14ft'` in `s` into an int16 array, only once per category if `s` is categorical"
+    if s.dtype.name == 'category': return _parse_units(pd.Series(s.cat.categories), unit)[s.cat.codes.to_numpy()]
+    return s.astype(str).str[:-len(unit)].astype(np.int16).to_numpy()
+
+_NORMALIZED = ['x_px', 'y_px', 'distance_ft', 'made', 'three_pointer']
+
+def normalize_df(dataframe):
+    "Returns `dataframe` with parsed int16 coordinates and distances, bool outcome columns and categorical labels"
+    if all(c in dataframe.columns for c in _NORMALIZED): return dataframe
+    return dataframe.assign(x_px=_parse_units(dataframe['x'], 'px'),
+                            y_px=_parse_units(dataframe['y'], 'px'),
+                            distance_ft=_parse_units(dataframe['distance'], 'ft'),
+                            made=(dataframe['outcome']=='made').to_numpy(),
+                            three_pointer=(dataframe['attempt']=='3-pointer').to_numpy(),
+                            outcome=dataframe['outcome'].astype('category'),
+                            attempt=dataframe['attempt'].astype('category'),
+                            team=dataframe['team'].astype('category'),
+                            shots_by=dataframe['shots_by'].astype('category'))
+
+# Cell
+def iter_df(path, chunksize:int=100000, teams=None, players=None, date_range:Optional[tuple]=None):
+    "Yields normalized chunks of at most `chunksize` rows of the csv at `path` with the shots of `teams` or `players` between the dates of `date_range`"
+    for chunk in pd.read_csv(path, chunksize=chunksize):
+        chunk = chunk.loc[_filter_mask(chunk, teams, players, date_range)]
+        if len(chunk): yield _compact_df(normalize_df(chunk))
+
+def _cached_df(path):
+    "Normalized dataframe of the csv at `path`, from its columnar cache, built first if needed"
+    stamp,cols = _source_stamp(path),_cache_dir(path)
+    meta = _cache_meta(cols, stamp)
+    if meta is not None:
+        try: return _read_cache(cols, meta=meta)
+        except FileNotFoundError: pass # replaced by another writer meanwhile, read from the csv below
+    with stage('read_csv'):
+        df = pd.read_csv(path)
+        _note(rows=len(df), nbytes=path.stat().st_size)
+    with stage('normalize'): df = _compact_df(normalize_df(df))
+    try: _write_cache(df, cols, stamp)
+    except (OSError, ValueError, TypeError): pass
+    return df
+
+@_instrumented('make_df')
+def make_df(path, cache:bool=True, chunksize:Optional[int]=None, **filters):
+    "Creates a pandas dataframe from `path`, reusing the columnar cache stored next to it if `cache`, or reading it in chunks of `chunksize` rows, keeping the shots that pass the `filters` of `iter_df`"
+    path = Path(path)
+    _note(path=str(path))
+    if chunksize: return _concat(list(iter_df(path, chunksize, **filters)) or [_compact_df(normalize_df(pd.read_csv(path, nrows=0)))])
+    df = _cached_df(path) if cache else pd.read_csv(path)
+    return df.loc[_filter_mask(df, **filters)].reset_index(drop=True) if filters else df
+
+def _season_cache(path):
+    "Columnar cache of the season csv at `path`, built first if needed"
+    path = Path(path)
+    if _cache_meta(_cache_dir(path), _source_stamp(path)) is None: make_df(path)
+    return _cache_dir(path)
 
 # Cell
 def delegates(to=None, keep=False):
@@ -203,231 +636,1056 @@ def delegates(to=None, keep=False):
         return f
     return _f
 
+# Cell
+_COURT_IMG = None
+
+def _download_court(fname):
+    "Downloads the court image to `fname` through a temporary file of its own, so that concurrent downloads can't mix"
+    fd,part = tempfile.mkstemp(dir=str(fname.parent), suffix='.part')
+    os.close(fd)
+    try:
+        download_url(URLs.COURT_IMG, Path(part), overwrite=True, show_progress=False)
+        matplotlib.image.imread(part)
+        os.replace(part, str(fname))
+    finally:
+        if os.path.exists(part): os.remove(part)
+
+def court_image():
+    "Decoded half court image, cached in `Config().config_path`, or `None` if it can't be downloaded"
+    global _COURT_IMG
+    if _COURT_IMG is None:
+        fname = Config().config_path/'nbahalfcourt.png'
+        try:
+            if fname.exists():
+                try: _COURT_IMG = matplotlib.image.imread(str(fname))
+                except Exception: os.remove(fname) # unreadable, downloaded again below
+            if _COURT_IMG is None:
+                _download_court(fname)
+                _COURT_IMG = matplotlib.image.imread(str(fname))
+        except Exception: _COURT_IMG = False
+    return _COURT_IMG if _COURT_IMG is not False else None
+
+def _agg_figure(figsize, dpi):
+    "A new `Figure` with its own Agg canvas, outside of pyplot"
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    fig = Figure(figsize=figsize, dpi=dpi)
+    FigureCanvasAgg(fig)
+    return fig
+
+def _draw_court(ax, color:str='#777777'):
+    "Draws the half court lines on `ax` in the coordinates of the court image"
+    from matplotlib.patches import Arc, Circle, Rectangle
+    hoop_x, hoop_y, three_r = 250, 419.5, 237.5
+    corner = np.degrees(np.arccos(220/three_r))
+    corner_y = hoop_y - three_r*np.sin(np.radians(corner))
+    lines = [Rectangle((0, 2), 500, 470),                                           # sidelines, baseline and half court line
+             Circle((hoop_x, hoop_y), 7.5),                                          # rim
+             Rectangle((220, 432), 60, 0),                                           # backboard
+             Rectangle((170, 282), 160, 190),                                        # lane
+             Arc((250, 282), 120, 120, theta1=180, theta2=360),                      # free throw circle
+             Arc((250, 282), 120, 120, theta1=0, theta2=180, linestyle='--'),
+             Arc((hoop_x, hoop_y), 80, 80, theta1=180, theta2=360),                  # restricted area
+             Rectangle((30, corner_y), 0, 472-corner_y),                             # corner threes
+             Rectangle((470, corner_y), 0, 472-corner_y),
+             Arc((hoop_x, hoop_y), 2*three_r, 2*three_r, theta1=180+corner, theta2=360-corner),
+             Arc((250, 2), 120, 120, theta1=0, theta2=180)]                          # center circle
+    for l in lines:
+        l.set_fill(False)
+        l.set_edgecolor(color)
+        ax.add_patch(l)
+    ax.set_xlim(0, 500)
+    ax.set_ylim(0, 472)
+    ax.set_aspect('equal')
+
+# Cell
+def _shots_cmap():
+    "Reds colormap fading to transparent for the least dense hexagons"
+    colors = plt.cm.Reds(np.arange(256))
+    colors[:,-1] = np.linspace(0, 0.8, 256)
+    return matplotlib.colors.ListedColormap(colors)
+
+def _metric_counts(dataframe):
+    "Attempts, makes and made 3-pointers of `dataframe` in one pass"
+    made = dataframe['made'].to_numpy()
+    return {'attempts': len(made), 'makes': int(made.sum()), 'threes_made': int((made & dataframe['three_pointer'].to_numpy()).sum())}
+
+def _metric(counts, metric="efg"):
+    "FG% or eFG% (`metric`) from `counts`"
+    if counts['attempts'] == 0: return 0
+    makes = counts['makes'] + (0.5 *counts['threes_made'] if metric == "efg" else 0)
+    return round(makes/counts['attempts'],2)
+
+def _shot_counts(dataframe, by:List[str]):
+    "Attempts, makes, made 3-pointers, FG% and eFG% of `dataframe` grouped by the `by` columns in a single pass"
+    made = dataframe['made'].to_numpy()
+    counts = pd.DataFrame({k: dataframe[k].values for k in by})
+    counts['attempts'] = np.ones(len(made), dtype=np.int32)
+    counts['makes'] = made.astype(np.int32)
+    counts['threes_made'] = (made & dataframe['three_pointer'].to_numpy()).astype(np.int32)
+    counts = counts.groupby(by, observed=True).sum()
+    counts['fg_pct'] = (counts['makes']/counts['attempts']).round(2)
+    counts['efg_pct'] = ((counts['makes'] + 0.5*counts['threes_made'])/counts['attempts']).round(2)
+    return counts
+
+def _zone_table(dataframe, by:Optional[str]=None):
+    keys = ([by] if by else []) + ['distance_ft', 'attempt']
+    table = _shot_counts(dataframe, keys).reset_index()
+    table.insert(len(keys)-2, 'distance', table['distance_ft'].astype(str)+'ft')
+    return table
+
+def shooting_table(dataframe, by:str='shots_by'):
+    "Attempts, makes, made 3-pointers, FG% and eFG% for every value of the `by` column of `dataframe` in one pass"
+    return _shot_counts(normalize_df(dataframe), [by])
+
+# Cell
+ZONES = ['restricted_area', 'paint', 'mid_range_left', 'mid_range_center', 'mid_range_right',
+         'corner_3_left', 'corner_3_right', 'above_the_break_3']
+
+_HOOP_PX = (34.5, 240)              # hoop in the `x_px`/`y_px` coordinates, 10 px per foot
+_LANE_PX = (172, 80)                # lane length from the baseline and half width
+_CORNER_PX = 124                    # the corner 3 ends where the arc meets the corner lines
+
+def court_zones(dataframe):
+    "Court zone of each shot of `dataframe`, as a categorical with the categories of `ZONES`"
+    dataframe = normalize_df(dataframe)
+    x = dataframe['x_px'].to_numpy().astype(np.float32)
+    y = dataframe['y_px'].to_numpy().astype(np.float32) - _HOOP_PX[1]
+    three = dataframe['three_pointer'].to_numpy()
+    corner = three & (x <= _CORNER_PX)
+    codes = np.select([corner & (y < 0), corner, three,
+                       (x - _HOOP_PX[0])**2 + y**2 <= 40**2,
+                       (np.abs(y) <= _LANE_PX[1]) & (x <= _LANE_PX[0]),
+                       np.abs(y) <= _LANE_PX[1], y < 0],
+                      [5, 6, 7, 0, 1, 3, 2], default=4)
+    return pd.Categorical.from_codes(codes.astype(np.int8), ZONES)
+
+def court_zone_table(dataframe, by:Optional[str]=None):
+    "Attempts, makes, made 3-pointers, FG% and eFG% per court zone of `dataframe`, also per `by` column if given, in one pass"
+    dataframe = normalize_df(dataframe)
+    keys = ([by] if by else []) + ['zone']
+    return _shot_counts(dataframe.assign(zone=court_zones(dataframe)), keys)
+
+# Cell
+HEX_GRIDSIZE = (50, 47)
+HEX_EXTENT = (0, 500, 0, 472)
+
+def _court_xy(dataframe, x_modifier=10, y_modifier=454):
+    "Coordinates of the shots in `dataframe` on the half court image"
+    return dataframe['y_px'].to_numpy() + x_modifier, y_modifier - dataframe['x_px'].to_numpy()
+
+def _hex_lattice():
+    (nx,ny),(xmin,xmax,ymin,ymax) = HEX_GRIDSIZE,HEX_EXTENT
+    # same padding as `plt.hexbin`, to avoid roundoff errors at the borders
+    padding = 1.e-9 * (xmax - xmin)
+    xmin,xmax = xmin-padding,xmax+padding
+    return nx, ny, xmin, ymin, (xmax-xmin)/nx, (ymax-ymin)/ny
+
+def hex_cells(xs, ys):
+    "Index of the hexagon every shot at (`xs`, `ys`) falls in, following `plt.hexbin`, or -1 outside of the grid"
+    nx,ny,xmin,ymin,sx,sy = _hex_lattice()
+    ix,iy = (np.asarray(xs) - xmin)/sx,(np.asarray(ys) - ymin)/sy
+    ix1,iy1 = np.round(ix).astype(int),np.round(iy).astype(int)
+    ix2,iy2 = np.floor(ix).astype(int),np.floor(iy).astype(int)
+    i1 = np.where((0 <= ix1) & (ix1 < nx+1) & (0 <= iy1) & (iy1 < ny+1), ix1*(ny+1) + iy1, -1)
+    i2 = np.where((0 <= ix2) & (ix2 < nx) & (0 <= iy2) & (iy2 < ny), (nx+1)*(ny+1) + ix2*ny + iy2, -1)
+    d1 = (ix - ix1)**2 + 3.0*(iy - iy1)**2
+    d2 = (ix - ix2 - 0.5)**2 + 3.0*(iy - iy2 - 0.5)**2
+    return np.where(d1 < d2, i1, i2)
+
+def hex_centers():
+    "Coordinates of the centers of the hexagons, in the order of `hex_cells`"
+    nx,ny,xmin,ymin,sx,sy = _hex_lattice()
+    cx = np.concatenate([np.repeat(np.arange(nx+1), ny+1), np.repeat(np.arange(nx) + 0.5, ny)])
+    cy = np.concatenate([np.tile(np.arange(ny+1), nx+1), np.tile(np.arange(ny), nx) + 0.5])
+    return cx*sx + xmin, cy*sy + ymin
+
+N_HEX_CELLS = (HEX_GRIDSIZE[0]+1)*(HEX_GRIDSIZE[1]+1) + HEX_GRIDSIZE[0]*HEX_GRIDSIZE[1]
+
+def hex_counts(xs, ys):
+    "Number of shots at (`xs`, `ys`) in every hexagon"
+    cells = hex_cells(xs, ys)
+    return np.bincount(cells[cells >= 0], minlength=N_HEX_CELLS)
+
+def _compact_counts(counts):
+    "`counts` as uint16, or as uint32 if some of them don't fit in uint16"
+    return counts.astype(np.uint16 if counts.max(initial=0) <= np.iinfo(np.uint16).max else np.uint32)
+
+def _plot_hex_counts(ax, counts):
+    "Draws the hexagons with `counts` shots on `ax`"
+    cx,cy = hex_centers()
+    shot = counts > 0
+    ax.hexbin(cx[shot], cy[shot], C=counts[shot], reduce_C_function=np.sum, gridsize=HEX_GRIDSIZE,
+              extent=HEX_EXTENT, bins='log', cmap=_shots_cmap())
+
+# Cell
+class ShotGrid:
+    "Attempts and makes per hexagon of the shot chart (columns) for every label (rows), as uint16 arrays, or uint32 once a count doesn't fit"
+    def __init__(self, labels, attempts, makes):
+        self.labels,self.attempts,self.makes = list(labels),attempts,makes
+        self._rows = {l:i for i,l in enumerate(self.labels)}
+
+    @classmethod
+    def from_df(cls, dataframe, by:Optional[str]=None):
+        "Grids of the shots in `dataframe`, one per value of the `by` column or a single `'all'` one"
+        dataframe = normalize_df(dataframe)
+        if by is None: codes,labels = np.zeros(len(dataframe), dtype=np.intp),['all']
+        else: codes,labels = pd.factorize(dataframe[by])
+        cells = hex_cells(*_court_xy(dataframe))
+        keep = (cells >= 0) & (codes >= 0)
+        flat = codes[keep]*N_HEX_CELLS + cells[keep]
+        size = len(labels)*N_HEX_CELLS
+        attempts = np.bincount(flat, minlength=size).reshape(len(labels), N_HEX_CELLS)
+        makes = np.bincount(flat[dataframe['made'].to_numpy()[keep]], minlength=size).reshape(len(labels), N_HEX_CELLS)
+        return cls(list(labels), _compact_counts(attempts), _compact_counts(makes))
+
+    def __len__(self): return len(self.labels)
+    def __contains__(self, label): return label in self._rows
+    def __getitem__(self, label):
+        "Attempts and makes of `label`"
+        i = self._rows[label]
+        return self.attempts[i],self.makes[i]
+
+    def __add__(self, other):
+        "Grids of both, with the counts of the labels they share added up"
+        labels = self.labels + [l for l in other.labels if l not in self._rows]
+        attempts = np.zeros((len(labels), N_HEX_CELLS), dtype=np.int64)
+        makes = np.zeros_like(attempts)
+        attempts[:len(self)],makes[:len(self)] = self.attempts,self.makes
+        rows = [labels.index(l) if l not in self._rows else self._rows[l] for l in other.labels]
+        np.add.at(attempts, rows, other.attempts)
+        np.add.at(makes, rows, other.makes)
+        return ShotGrid(labels, _compact_counts(attempts), _compact_counts(makes))
+
+    def total(self, labels:Optional[Collection]=None):
+        "Attempts and makes summed over `labels`, all of them by default, as uint32 arrays"
+        rows = slice(None) if labels is None else [self._rows[l] for l in labels]
+        return self.attempts[rows].sum(axis=0, dtype=np.uint32),self.makes[rows].sum(axis=0, dtype=np.uint32)
+
+    def figure(self, labels:Optional[Collection]=None, made:bool=False):
+        "Draws the heatmap of the attempts (or makes if `made`) of `labels` on a new `Figure`, outside of pyplot"
+        config = Config()
+        fig = _agg_figure((config.fig_height/config.my_dpi, config.fig_width/config.my_dpi), config.my_dpi)
+        ax = fig.add_subplot(1, 1, 1)
+        img = court_image()
+        if img is None: _draw_court(ax)
+        else: ax.imshow(img, extent=[0,500,0,472])
+        _plot_hex_counts(ax, self.total(labels)[1 if made else 0])
+        return fig
+
+    def save(self, fname):
+        "Saves the grids to the `.npz` file `fname`"
+        np.savez(fname, labels=np.array(self.labels, dtype=str), attempts=self.attempts, makes=self.makes)
+
+    @classmethod
+    def load(cls, fname):
+        "Grids saved by `save` in `fname`"
+        with np.load(fname) as f: return cls(f['labels'].tolist(), f['attempts'], f['makes'])
+
+# Cell
+_NO_ROWS = np.array([], dtype=np.intp)
+
+def _positions(values):
+    "Maps every value in `values` to the array of positions where it appears"
+    return pd.DataFrame({'k': values}).groupby('k', observed=True, sort=False).indices
+
+def _as_date_key(date): return date[0]*10000 + date[1]*100 + date[2] if isinstance(date, tuple) else date.year*10000 + date.month*100 + date.day
+
+def _date_key(dataframe): return (dataframe['year'].to_numpy()*10000 + dataframe['month'].to_numpy()*100 + dataframe['day'].to_numpy()).astype(np.int32)
+
+def _take(dataframe, positions):
+    "Rows of `dataframe` at the ascending `positions`, as a slice if they are contiguous"
+    if len(positions) and positions[-1] - positions[0] + 1 == len(positions): return dataframe.iloc[positions[0]:positions[-1]+1]
+    return dataframe.take(positions)
+
+class ShotIndex:
+    "Row positions of every team, player, game and date of `dataframe`"
+    def __init__(self, dataframe):
+        self.n = len(dataframe)
+        self.teams = _positions(dataframe['team'].values)
+        self.players = _positions(dataframe['shots_by'].values)
+        self.games = _positions(dataframe['game_id'].values)
+        keys = _date_key(dataframe)
+        self.dates = _positions(keys)
+        self.date_order = np.argsort(keys, kind='mergesort')
+        self.sorted_dates = keys[self.date_order]
+
+    def between(self, start:int, end:int):
+        "Ascending positions of the rows dated from `start` to `end` included, both `year*10000 + month*100 + day` keys"
+        lo = np.searchsorted(self.sorted_dates, start, side='left')
+        hi = np.searchsorted(self.sorted_dates, end, side='right')
+        return np.sort(self.date_order[lo:hi])
+
+    def extend(self, dataframe):
+        "Adds the rows of `dataframe`, appended after the indexed ones, updating only the entries they touch"
+        for mapping,values in ((self.teams, dataframe['team'].values), (self.players, dataframe['shots_by'].values),
+                               (self.games, dataframe['game_id'].values), (self.dates, _date_key(dataframe))):
+            for k,positions in _positions(values).items(): mapping[k] = np.concatenate([mapping.get(k, _NO_ROWS), positions + self.n])
+        keys = np.concatenate([self.sorted_dates, _date_key(dataframe)])
+        order = np.argsort(keys, kind='mergesort')
+        self.date_order = np.concatenate([self.date_order, np.arange(self.n, self.n + len(dataframe))])[order]
+        self.sorted_dates = keys[order]
+        self.n += len(dataframe)
+
+def _key_arrays(dataframe):
+    "Arrays holding the date, team, player and game columns of `dataframe`, the same objects until these columns are replaced or reordered"
+    arrays = []
+    for c in ('year', 'month', 'day', 'team', 'shots_by', 'game_id'):
+        s = dataframe[c]
+        a = s.array if isinstance(s.dtype, pd.api.extensions.ExtensionDtype) else s.to_numpy()
+        while isinstance(getattr(a, 'base', None), np.ndarray): a = a.base
+        arrays.append(a)
+    return arrays
+
+_INDEXES = {}
+
+def _register_index(dataframe, index, arrays=None):
+    key = id(dataframe)
+    arrays = [weakref.ref(a) for a in (arrays if arrays is not None else _key_arrays(dataframe))]
+    _INDEXES[key] = (weakref.ref(dataframe, lambda _: _INDEXES.pop(key, None)), index, arrays)
+    return index
+
+def season_index(dataframe, rebuild:bool=False):
+    "`ShotIndex` of `dataframe`, built on first use and kept while `dataframe` is alive and its key columns aren't replaced, or built again if `rebuild`"
+    ref,index,arrays = _INDEXES.get(id(dataframe), (None, None, []))
+    current = _key_arrays(dataframe)
+    if (rebuild or ref is None or ref() is not dataframe or index.n != len(dataframe)
+        or any(a() is not c for a,c in zip(arrays, current))): index = _register_index(dataframe, ShotIndex(dataframe), current)
+    return index
+
+# Cell
+def list_game_ids(dataframe,year,month,day):
+    "Lists unique game ids in `dataframe` for a given date"
+    positions = season_index(dataframe).dates.get(year*10000 + month*100 + day, _NO_ROWS)
+    return _take(dataframe, positions)[['game_id','winner','loser']].drop_duplicates()
+
+
+# Cell
+def _checksum(values): return zlib.crc32(np.ascontiguousarray(values).data)
+
+def _column_crcs(dataframe, columns):
+    "CRCs of the `columns` of `dataframe`, which change when their values are edited or reordered"
+    crcs = [len(dataframe)]
+    for c in columns:
+        s = dataframe[c]
+        # categories are immutable, replacing them gives a new object
+        if s.dtype.name == 'category': crcs += [_checksum(s.cat.codes.to_numpy()), id(s.cat.categories)]
+        elif pd.api.types.is_numeric_dtype(s): crcs.append(_checksum(s.to_numpy()))
+        else: crcs.append(_checksum(pd.util.hash_array(s.to_numpy())))
+    return tuple(crcs)
+
+_OUTCOME = ['made', 'three_pointer']
+
 # Cell
 class Shots:
     "Plots shot chart and most/least effective shots using `plot_shots` and `plot_effective`"
+    @_instrumented('shots')
     def __init__(self, dataframe):
-        self.dataframe = dataframe
+        self.dataframe = normalize_df(dataframe)
+        _note(rows=len(dataframe))
         self.__X_MODIFIER = 10
         self.__Y_MODIFIER = 454
 
 
+    @property
+    def dataframe(self): return self._dataframe
+
+    @dataframe.setter
+    def dataframe(self, dataframe):
+        self._dataframe = dataframe
+        self._cache = {}
+
+    def _cached(self, key, f, columns:Collection[str]):
+        "Result of `f()`, memoized until `dataframe` is replaced or the values of the `columns` it is computed from change"
+        crcs = _column_crcs(self._dataframe, columns)
+        cached = self._cache.get(key)
+        if cached is None or cached[0] != crcs: cached = self._cache[key] = (crcs, f())
+        return cached[1]
+
     @property
     def teams(self):
-        return self.dataframe['team'].drop_duplicates()
+        return self._cached('teams', lambda: self.dataframe['team'].drop_duplicates(), ['team'])
 
     @property
     def players(self):
-        return self.dataframe['shots_by'].drop_duplicates()
+        return self._cached('players', lambda: self.dataframe['shots_by'].drop_duplicates(), ['shots_by'])
+
+    @property
+    def counts(self):
+        "Attempts, makes and made 3-pointers of all the shots"
+        return self._cached('counts', lambda: _metric_counts(self.dataframe), _OUTCOME)
 
     @property
     def fg_pct(self):
-        return self.__calculate_metric(self.dataframe,"fg")
+        return _metric(self.counts,"fg")
 
     @property
     def efg_pct(self):
-        return self.__calculate_metric(self.dataframe,"efg")
+        return _metric(self.counts,"efg")
 
-    def __calculate_metric(self, dataframe, metric="efg"):
-        if len(dataframe)==0:
-            return 0
-        if metric == "fg":
-            return round(len(dataframe.loc[dataframe['outcome']=='made'])/len(dataframe),2)
-        else:
-            return round( (len(dataframe.loc[dataframe['outcome']=='made']) + 0.5 *len(dataframe.loc[(dataframe['outcome']=='made') & (dataframe['attempt']=='3-pointer')]))/len(dataframe),2)
+    def __court_xy(self, dataframe):
+        return _court_xy(dataframe, self.__X_MODIFIER, self.__Y_MODIFIER)
+
+    def __figure(self, pyplot:bool=True):
+        config = Config()
+        figsize = (2 * config.fig_height/config.my_dpi, config.fig_width/config.my_dpi)
+        if pyplot: return plt.figure(figsize=figsize, dpi=config.my_dpi)
+        return _agg_figure(figsize, config.my_dpi)
 
-    def __plot_shot_chart(self, dataframe, metric:str="efg",attempt:str="all", distance_limit:Union[int,tuple]=29):
+    def __plot_shot_chart(self, fig, dataframe, metric:str="efg",attempt:str="all", distance_limit:Union[int,tuple]=29):
         if type(distance_limit) == int:
-            distances = [str(x)+"ft" for x in range(distance_limit+1)]
+            min_distance, max_distance = 0, distance_limit
         else:
-            distances = [str(x)+"ft" for x in range(distance_limit[0],distance_limit[1]+1)]
-        plt.figure(figsize=(2 * Config().fig_height/Config().my_dpi, Config().fig_width/Config().my_dpi), dpi=Config().my_dpi)
-        ax = plt.subplot(1, 2, 1)
-        plt.title("Shot chart")
-        img = plt.imread("http://d2p3bygnnzw9w3.cloudfront.net/req/1/images/bbr/nbahalfcourt.png")
-        implot = plt.imshow(img, extent=[0,500,0,472])
+            min_distance, max_distance = distance_limit
+        ax = fig.add_subplot(1, 2, 1)
+        ax.set_title("Shot chart")
+        img = court_image()
+        if img is None: _draw_court(ax)
+        else: implot = ax.imshow(img, extent=[0,500,0,472])
         if attempt == "2-pointer":
-                shots_df = dataframe.loc[(dataframe["attempt"]=="2-pointer") & (dataframe["distance"].isin(distances))]
+                shots_df = dataframe.loc[~dataframe["three_pointer"] & dataframe["distance_ft"].between(min_distance, max_distance)]
         elif attempt == "3-pointer":
-                shots_df = dataframe.loc[(dataframe["attempt"]=="3-pointer") & (dataframe["distance"].isin(distances))]
+                shots_df = dataframe.loc[dataframe["three_pointer"] & dataframe["distance_ft"].between(min_distance, max_distance)]
         else:
             shots_df = dataframe
         if len(shots_df) > 200:
 #         print(len(shots_df))
-            ys = shots_df['x'].apply(lambda x: x.split("px")[0]).to_list()
-            ys = [self.__Y_MODIFIER - int(x) for x in ys]
-            xs = shots_df['y'].apply(lambda x: int(x.split("px")[0])).to_list()
-            xs = [x + self.__X_MODIFIER for x in xs]
-            mycmap = plt.cm.Reds
-            mycmap._init()
-            mycmap._lut[:,-1] = np.linspace(0, 0.8, 256+3)
-            plt.hexbin(xs, ys, gridsize=(50,47), bins='log',cmap=mycmap)
+            xs, ys = self.__court_xy(shots_df)
+            _plot_hex_counts(ax, hex_counts(xs, ys))
     #         cb = plt.colorbar(label='count in bin')
         else:
-            made_df = shots_df.loc[shots_df['outcome']=="made"]
-            missed_df = shots_df.loc[shots_df['outcome']=="missed"]
-            ys = made_df['x'].apply(lambda x: x.split("px")[0]).to_list()
-            ys = [self.__Y_MODIFIER - int(x) for x in ys]
-            xs = made_df['y'].apply(lambda x: int(x.split("px")[0])).to_list()
-            xs = [x + self.__X_MODIFIER for x in xs]
+            xs, ys = self.__court_xy(shots_df)
+            made = shots_df['made'].to_numpy()
 #             if most_or_least == 'most':
-            plt.scatter(xs, ys,c='g',marker='o',s=10, alpha=1)
+            ax.scatter(xs[made], ys[made],c='g',marker='o',s=10, alpha=1)
 #             else:
 #                 plt.scatter(xs, ys,c='g',marker='o',s=10, alpha=0.2)
-            ys = missed_df['x'].apply(lambda x: x.split("px")[0]).to_list()
-            ys = [self.__Y_MODIFIER - int(x) for x in ys]
-            xs = missed_df['y'].apply(lambda x: int(x.split("px")[0])).to_list()
-            xs = [x + self.__X_MODIFIER for x in xs]
 #             if most_or_least == 'least':
 #                 plt.scatter(xs, ys,c='g',marker='o',s=10, alpha=1)
 #             else:
-            plt.scatter(xs, ys,c='orange',marker='x',s=10, alpha=0.5)
+            ax.scatter(xs[~made], ys[~made],c='orange',marker='x',s=10, alpha=0.5)
 #             plt.scatter(xs, ys,c='orange',marker='x',s=10)
         return
 
-    def __plot_hist_volume(self, dataframe, fg_pct:float, efg_pct:float, most_or_least:str=None, final_distance:str=None, final_attempt:str=None,made:bool=True,missed:bool=True):
+    def __plot_hist_volume(self, fig, dataframe, fg_pct:float, efg_pct:float, most_or_least:str=None, final_distance:str=None, final_attempt:str=None,made:bool=True,missed:bool=True):
         if made:
-            ax = plt.subplot(1, 2, 2)
-            plt.title("Shot distribution - all distances")
-            distances_all_shots = dataframe['distance'].apply(lambda x: int(x.split('ft')[0])).to_list()
-            make_shots = dataframe.loc[dataframe['outcome']=='made']['distance'].apply(lambda x: int(x.split('ft')[0])).to_list()
+            ax = fig.add_subplot(1, 2, 2)
+            ax.set_title("Shot distribution - all distances")
+            distances_all_shots = dataframe['distance_ft'].to_numpy()
+            make_shots = distances_all_shots[dataframe['made'].to_numpy()]
             shots_to_plot = [make_shots,distances_all_shots]
-            plt.hist(shots_to_plot, bins = range( 0, max(distances_all_shots)+1, 1), align="left",stacked=True, label=['made','all'], color=['green', '#ff7f0e'])
-            plt.legend(loc="upper center")
+            ax.hist(shots_to_plot, bins = range( 0, distances_all_shots.max()+1, 1), align="left",stacked=True, label=['made','all'], color=['green', '#ff7f0e'])
+            ax.legend(loc="upper center")
             if most_or_least and final_distance and final_attempt:
                 ax.text(30 + 12, 1, most_or_least+" effective shot: "+str(final_distance)+"\n Attempt: "+final_attempt+"\n\nMetrics:\n FG%: "+str(fg_pct)+"\n eFG%: "+str(efg_pct), bbox=dict(facecolor='red', alpha=0.5))
             else:
                 ax.text(30 + 12, 1, "Metrics:\n FG%: "+str(fg_pct)+"\n eFG%: "+str(efg_pct), bbox=dict(facecolor='red', alpha=0.5))
         return
 
+    def _view(self, dataframe):
+        "Copy of `self`, keeping attributes like `team` or `player`, over the rows in `dataframe`"
+        view = copy.copy(self)
+        Shots.__init__(view, dataframe)
+        return view
+
+    def between(self, start, end):
+        "Shots from the `start` to the `end` date included, given as `(year, month, day)` tuples or dates"
+        return self._view(_take(self.dataframe, season_index(self.dataframe).between(_as_date_key(start), _as_date_key(end))))
+
+    def shot_grid(self, by:Optional[str]=None):
+        "`ShotGrid` of the shots, one row per value of the `by` column if given"
+        return ShotGrid.from_df(self.dataframe, by)
+
+    def zone_table(self, by:Optional[str]=None):
+        "Attempts, makes, made 3-pointers, FG% and eFG% per distance and attempt type, also per `by` column if given"
+        return self._cached(('zone_table', by), lambda: _zone_table(self.dataframe, by), _OUTCOME + ['distance_ft', 'attempt'] + ([by] if by else []))
+
+    def shooting_table(self, by:str='shots_by'):
+        "Attempts, makes, made 3-pointers, FG% and eFG% for every value of the `by` column"
+        return self._cached(('shooting_table', by), lambda: shooting_table(self.dataframe, by), _OUTCOME + [by])
+
+    def court_zone_table(self, by:Optional[str]=None):
+        "Attempts, makes, made 3-pointers, FG% and eFG% per court zone, also per `by` column if given"
+        return self._cached(('court_zone_table', by), lambda: court_zone_table(self.dataframe, by), _OUTCOME + ['x_px', 'y_px'] + ([by] if by else []))
+
     def list_game_ids(self,year,month,day):
         "Lists unique game ids in `dataframe` for a given date"
-        return self.dataframe.loc[(self.dataframe['year']==year) & (self.dataframe['month']==month) & (self.dataframe['day']==day)][['game_id','winner','loser']].drop_duplicates()
+        return list_game_ids(self.dataframe, year, month, day)
 
-    @delegates(__plot_shot_chart)
-    def plot_shots(self,date_range:Union[str,tuple,int]="all",**kwargs):
-        "Plots the shot chart for a given `date_range` including `made`, `missed` and `attempt` shots within `distances`"
-        #use kwargs
+    def __shots(self, fig, date_range:Union[str,tuple,int]="all", **kwargs):
         if date_range == "all":
             shots_df = self.dataframe
         elif type(date_range) == str:
-            shots_df = self.dataframe.loc[self.dataframe['game_id']==date_range]
+            shots_df = _take(self.dataframe, season_index(self.dataframe).games.get(date_range, _NO_ROWS))
         elif type(date_range) == int:
             #means month
             shots_df = self.dataframe.loc[self.dataframe["month"]==date_range]
         else:
-            copy_df = self.dataframe.copy()
-            copy_df['Timestamp'] = pd.to_datetime(copy_df.loc[:][['year','month','day']])
-            # Create a DatetimeIndex and assign it to the dataframe.
-            copy_df.index = pd.DatetimeIndex(copy_df.Timestamp)
-            shots_df = copy_df.loc[str(str(date_range[0][0])+"-"+str(date_range[0][1])+"-"+str(date_range[0][2])):str(str(date_range[1][0])+"-"+str(date_range[1][1])+"-"+str(date_range[1][2]))]
-        self.__plot_shot_chart(shots_df, **kwargs)
-        self.__plot_hist_volume(shots_df, self.__calculate_metric(self.dataframe, "fg"), self.__calculate_metric(self.dataframe, "efg"))
-        plt.show()
+            shots_df = self.between(*date_range).dataframe
+        _note(rows=len(shots_df))
+        self.__plot_shot_chart(fig, shots_df, **kwargs)
+        self.__plot_hist_volume(fig, shots_df, self.fg_pct, self.efg_pct)
+        return fig
 
+    @_instrumented('plot_shots')
     @delegates(__plot_shot_chart)
-    def plot_effective(self, most_or_least="most",metric:str="efg", min_shots:Union[str,int]="none", exclude:Union[str,List["str"]]="none", **kwargs):
-        "Plots the shot chart based on `most_or_least` considering a given `metric` for `date_range` including `made`, `missed` and `attempt` shots within `distances`. You can optionally `exclude` some shots. The `min_shots` option lets you filter based on a minimum ammount of shots taken per distance, auto == uniform distribution [0ft,29ft] as tracked by https://stats.nba.com/players/shooting/?sort=25-29%20ft.%20FGA&dir=1&Season=2019-20&SeasonType=Regular%20Season&CF=PLAYER_NAME*E*"
-        distances = ["0ft","1ft","2ft","3ft","4ft","5ft","6ft","7ft","8ft","9ft","10ft","11ft","12ft","13ft","14ft","15ft","16ft","17ft","18ft","19ft","20ft","21ft","22ft","23ft","24ft","25ft","26ft","27ft","28ft"]
-        distances = set(distances).intersection(set(self.dataframe['distance'].drop_duplicates().to_list()))
+    def plot_shots(self,date_range:Union[str,tuple,int]="all",**kwargs):
+        "Plots the shot chart for a given `date_range` including `made`, `missed` and `attempt` shots within `distances`"
+        self.__shots(self.__figure(), date_range, **kwargs)
+        with stage('show'): plt.show()
+
+    @_instrumented('shots_figure')
+    @delegates(__plot_shot_chart)
+    def shots_figure(self,date_range:Union[str,tuple,int]="all",**kwargs):
+        "Draws the `plot_shots` chart on a new `Figure` outside of pyplot, safe to render in worker threads and processes"
+        return self.__shots(self.__figure(pyplot=False), date_range, **kwargs)
+
+    def __effective(self, fig, most_or_least="most",metric:str="efg", min_shots:Union[str,int]="none", exclude:Union[str,List["str"]]="none", **kwargs):
+        table = self.zone_table()
+        table = table.loc[table['distance_ft'] <= 28]
         if type(exclude) == list:
-            distances = list(set(distances) - set(exclude))
+            table = table.loc[~table['distance'].isin(exclude)]
         #if auto, use uniform distro
-        if min_shots == "none":
-            new_df = self.dataframe
-        elif min_shots == "auto":
-            min_value = round(len(self.dataframe)/30,0) # [0ft, 29ft]
-            new_df = pd.DataFrame(columns = self.dataframe.columns)
-            for distance in distances:
-                if len(self.dataframe.loc[self.dataframe['distance']==distance]) >= min_value:
-                    new_df = new_df.append(self.dataframe.loc[self.dataframe['distance']==distance])
-        else:
-            min_value = min_shots
-            new_df = pd.DataFrame(columns = self.dataframe.columns)
-            for distance in distances:
-                if len(self.dataframe.loc[self.dataframe['distance']==distance]) >= min_value:
-                    new_df = new_df.append(self.dataframe.loc[self.dataframe['distance']==distance])
-        if most_or_least == "most":
-            max_fg = -1
-            max_efg = -1
-            final_distance = ""
-            for attempt in ["2-pointer", "3-pointer"]:
-                for distance in distances:
-                    player_df = new_df.loc[(new_df["distance"]==distance) & (new_df["attempt"]==attempt)]
-                    if len(player_df) == 0:
-                        continue
-                    fg_pct = self.__calculate_metric(player_df, "fg")
-                    efg_pct = self.__calculate_metric(player_df, "efg")
-                    if metric == "fg":
-                        if fg_pct > max_fg:
-                            max_fg = fg_pct
-                            max_efg = efg_pct
-                            final_distance = distance
-                            final_attempt = attempt
-                    else:
-                        if efg_pct > max_efg:
-                            max_fg = fg_pct
-                            max_efg = efg_pct
-                            final_distance = distance
-                            final_attempt = attempt
-        else:
-            max_fg = 101
-            max_efg = 101
-            final_distance = ""
-            for attempt in ["2-pointer", "3-pointer"]:
-                for distance in distances:
-                    player_df = new_df.loc[(new_df["distance"]==distance) & (new_df["attempt"]==attempt)]
-                    if len(player_df) == 0:
-                        continue
-                    fg_pct = self.__calculate_metric(player_df, "fg")
-                    efg_pct = self.__calculate_metric(player_df, "efg")
-                    if metric == "fg":
-                        if fg_pct < max_fg:
-                            max_fg = fg_pct
-                            max_efg = efg_pct
-                            final_distance = distance
-                            final_attempt = attempt
-                    else:
-                        if efg_pct < max_efg:
-                            max_fg = fg_pct
-                            max_efg = efg_pct
-                            final_distance = distance
-                            final_attempt = attempt
-        player_df = new_df.loc[(new_df["distance"]==final_distance) & (new_df["attempt"] == final_attempt)]
-        self.__plot_shot_chart(player_df, **kwargs)
+        if min_shots != "none":
+            min_value = round(len(self.dataframe)/30,0) if min_shots == "auto" else min_shots # [0ft, 29ft]
+            table = table.loc[table.groupby('distance_ft')['attempts'].transform('sum') >= min_value]
+        if len(table) == 0: raise _NotFound('no distance left to rank, with these shots and `exclude` and `min_shots`')
+        table = table.sort_values(['attempt', 'distance_ft'], kind='mergesort')
+        column = "fg_pct" if metric == "fg" else "efg_pct"
+        best = table.loc[table[column].idxmax() if most_or_least == "most" else table[column].idxmin()]
+        final_distance, final_attempt = best['distance'], best['attempt']
+        player_df = self.dataframe.loc[(self.dataframe["distance_ft"]==best['distance_ft']) & (self.dataframe["attempt"] == final_attempt)]
+        _note(rows=len(player_df))
+        self.__plot_shot_chart(fig, player_df, **kwargs)
         all_shots = self.dataframe
-        self.__plot_hist_volume(all_shots, fg_pct=max_fg, efg_pct=max_efg, most_or_least=most_or_least, final_distance=final_distance, final_attempt=final_attempt)
-        plt.show()
+        self.__plot_hist_volume(fig, all_shots, fg_pct=float(best['fg_pct']), efg_pct=float(best['efg_pct']), most_or_least=most_or_least, final_distance=final_distance, final_attempt=final_attempt)
+        return fig
+
+    @_instrumented('plot_effective')
+    @delegates(__plot_shot_chart)
+    def plot_effective(self, most_or_least="most",metric:str="efg", min_shots:Union[str,int]="none", exclude:Union[str,List["str"]]="none", **kwargs):
+        "Plots the shot chart based on `most_or_least` considering a given `metric` for `date_range` including `made`, `missed` and `attempt` shots within `distances`. You can optionally `exclude` some shots. The `min_shots` option lets you filter based on a minimum ammount of shots taken per distance, auto == uniform distribution [0ft,29ft] as tracked by https://stats.nba.com/players/shooting/?sort=25-29%20ft.%20FGA&dir=1&Season=2019-20&SeasonType=Regular%20Season&CF=PLAYER_NAME*E*"
+        self.__effective(self.__figure(), most_or_least, metric, min_shots, exclude, **kwargs)
+        with stage('show'): plt.show()
+
+    @_instrumented('effective_figure')
+    @delegates(__plot_shot_chart)
+    def effective_figure(self, most_or_least="most",metric:str="efg", min_shots:Union[str,int]="none", exclude:Union[str,List["str"]]="none", **kwargs):
+        "Draws the `plot_effective` chart on a new `Figure` outside of pyplot, safe to render in worker threads and processes"
+        return self.__effective(self.__figure(pyplot=False), most_or_least, metric, min_shots, exclude, **kwargs)
 
 # Cell
 def list_teams(dataframe):
     "Lists all the teams in `dataframe`"
     return dataframe['team'].drop_duplicates()
 
-# Cell
-def list_game_ids(dataframe,year,month,day):
-    "Lists unique game ids in `dataframe` for a given date"
-    return dataframe.loc[(dataframe['year']==year) & (dataframe['month']==month) & (dataframe['day']==day)][['game_id','winner','loser']].drop_duplicates()
-
-
 # Cell
 class TeamShots(Shots):
     "Team shots"
+    @_instrumented('team_shots')
     def __init__(self, dataframe, team):
-        dataframe = dataframe.loc[dataframe['team']==team].copy()
+        _note(team=team, scanned=len(dataframe))
+        dataframe = _take(dataframe, season_index(dataframe).teams.get(team, _NO_ROWS))
         self.team = team
         super().__init__(dataframe)
 
 # Cell
 def list_team_players(dataframe, team):
     "Lists the players in `dataframe` who took shots for a `team`"
-    return dataframe.loc[dataframe['team']==team].groupby('shots_by').shots_by.count().reset_index(name='count').sort_values(['count'], ascending=False)
+    return _take(dataframe, season_index(dataframe).teams.get(team, _NO_ROWS)).groupby('shots_by', observed=True).shots_by.count().reset_index(name='count').sort_values(['count'], ascending=False)
 
 # Cell
 class PlayerShots(Shots):
     "Player shots"
+    @_instrumented('player_shots')
     def __init__(self, dataframe, player):
-        self.team_total_shots = len(dataframe.loc[dataframe['team'] == dataframe.loc[dataframe['shots_by']==player]['team'].to_list()[0]])
-        dataframe = dataframe.loc[dataframe['shots_by']==player].copy()
+        _note(player=player, scanned=len(dataframe))
+        index = season_index(dataframe)
+        positions = index.players.get(player, _NO_ROWS)
+        self.team_total_shots = len(index.teams[dataframe['team'].iat[positions[0]]])
+        dataframe = _take(dataframe, positions)
         self.player = player
         super().__init__(dataframe)
+
+
+# Cell
+def _sum_rows(counts, rows, n):
+    "Sums the rows of `counts` (shape `(3, pairs, distances)`) into `n` rows, pair `i` going to row `rows[i]`"
+    out = np.zeros((counts.shape[0], n, counts.shape[2]), dtype=counts.dtype)
+    np.add.at(out, (slice(None), rows), counts)
+    return out
+
+def _pct_table(counts, labels, distances=None):
+    "Attempts, makes, made 3-pointers, FG% and eFG% from `counts`, per label and also per distance if `distances`"
+    attempts,makes,threes = (c if distances is not None else c.sum(axis=-1) for c in counts)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        fg,efg = makes/attempts,(makes + 0.5*threes)/attempts
+    if distances is None:
+        return pd.DataFrame({'attempts': attempts, 'makes': makes, 'threes_made': threes,
+                             'fg_pct': fg.round(2), 'efg_pct': efg.round(2)}, index=pd.Index(labels))
+    return {k: pd.DataFrame(v, index=pd.Index(labels), columns=pd.Index(distances, name='distance_ft'))
+            for k,v in (('attempts', attempts), ('fg_pct', fg), ('efg_pct', efg))}
+
+class ShotComparison:
+    "Distance distributions, FG% and eFG% of every player, team and the league of `dataframe`, counted in one pass, leaving out the shots without a player or a team"
+    def __init__(self, dataframe):
+        dataframe = normalize_df(dataframe)
+        players,self.players = pd.factorize(dataframe['shots_by'], sort=True)
+        teams,self.teams = pd.factorize(dataframe['team'], sort=True)
+        # `factorize` gives -1 for missing values, which would be counted for the last player or team
+        keep = (players >= 0) & (teams >= 0)
+        players,teams = players[keep],teams[keep]
+        distance = dataframe['distance_ft'].to_numpy()[keep].astype(np.intp)
+        self.distances = np.arange(distance.max() + 1 if len(distance) else 1)
+        pairs,keys = pd.factorize(players.astype(np.int64)*len(self.teams) + teams)
+        made,n = dataframe['made'].to_numpy()[keep],len(self.distances)
+        flat,size = pairs*n + distance,len(keys)*n
+        counts = np.stack([np.bincount(flat, minlength=size), np.bincount(flat[made], minlength=size),
+                           np.bincount(flat[made & dataframe['three_pointer'].to_numpy()[keep]], minlength=size)]).reshape(3, len(keys), n)
+        pair_player,pair_team = keys // len(self.teams),keys % len(self.teams)
+        self.counts = {'player': _sum_rows(counts, pair_player, len(self.players)),
+                       'team': _sum_rows(counts, pair_team, len(self.teams)),
+                       'league': counts.sum(axis=1, keepdims=True)}
+        # the team a player took the most shots for
+        main_pair = pd.Series(counts[0].sum(axis=1)).groupby(pair_player).idxmax().to_numpy()
+        self.player_team = dict(zip(self.players, self.teams[pair_team[main_pair]]))
+
+    def labels(self, level:str='player'): return {'player': self.players, 'team': self.teams, 'league': pd.Index(['league'])}[level]
+
+    def table(self, level:str='player'):
+        "Attempts, makes, made 3-pointers, FG% and eFG% of every `level` (`player`, `team` or `league`)"
+        return _pct_table(self.counts[level], self.labels(level))
+
+    def distributions(self, level:str='player', normalize:bool=True):
+        "Attempts per distance of every `level`, as shares of their attempts if `normalize`"
+        attempts = pd.DataFrame(self.counts[level][0], index=self.labels(level), columns=pd.Index(self.distances, name='distance_ft'))
+        return attempts.div(attempts.sum(axis=1).replace(0, 1), axis=0) if normalize else attempts
+
+    def efficiency(self, level:str='player', metric:str='efg', relative:bool=True):
+        "FG% or eFG% (`metric`) per distance of every `level`, minus the league's if `relative`, NaN where there are no attempts"
+        column = 'fg_pct' if metric == 'fg' else 'efg_pct'
+        pct = _pct_table(self.counts[level], self.labels(level), self.distances)[column]
+        return pct - _pct_table(self.counts['league'], ['league'], self.distances)[column].values if relative else pct
+
+    def compare(self, player:str):
+        "Attempts, share of attempts, FG% and eFG% per distance of `player`, their team and the league, side by side"
+        frames = []
+        for name,level,label in (('player', 'player', player), ('team', 'team', self.player_team[player]), ('league', 'league', 'league')):
+            row = self.labels(level).get_loc(label)
+            tables = _pct_table(self.counts[level][:, row:row+1], [label], self.distances)
+            attempts = tables['attempts'].iloc[0]
+            frames.append(pd.DataFrame({f'{name}_attempts': attempts, f'{name}_share': attempts/max(attempts.sum(), 1),
+                                        f'{name}_fg_pct': tables['fg_pct'].iloc[0].round(2), f'{name}_efg_pct': tables['efg_pct'].iloc[0].round(2)}))
+        return pd.concat(frames, axis=1)
+
+    def __draw(self, fig, player):
+        table = self.compare(player)
+        ax = fig.add_subplot(1, 1, 1)
+        ax.set_title(f"Shot distribution - {player} vs league")
+        makes = self.counts['player'][1, self.players.get_loc(player)]
+        ax.bar(self.distances, makes, width=1, color='green', label='made')
+        ax.bar(self.distances, table['player_attempts'] - makes, width=1, bottom=makes, color='#ff7f0e', label='missed')
+        total = table['player_attempts'].sum()
+        ax.step(self.distances, table['league_share']*total, where='mid', color='black', label='league')
+        ax.step(self.distances, table['team_share']*total, where='mid', color='blue', linestyle='--', label=self.player_team[player])
+        ax.legend(loc="upper left")
+        metrics = pd.concat([self.table('player').loc[[player]], self.table('team').loc[[self.player_team[player]]], self.table('league')])
+        ax.text(0.98, 0.98, "FG% / eFG%\n" + "\n".join(f"{l}: {r.fg_pct} / {r.efg_pct}" for l,r in metrics.iterrows()),
+                transform=ax.transAxes, ha='right', va='top', bbox=dict(facecolor='red', alpha=0.5))
+        return fig
+
+    def plot(self, player:str):
+        "Plots the shot distribution of `player` over the ones of the league and of their team, scaled to their attempts"
+        config = Config()
+        self.__draw(plt.figure(figsize=(config.fig_height/config.my_dpi, config.fig_width/config.my_dpi), dpi=config.my_dpi), player)
+        with stage('show'): plt.show()
+
+    def figure(self, player:str):
+        "Draws the `plot` chart on a new `Figure` outside of pyplot"
+        config = Config()
+        return self.__draw(_agg_figure((config.fig_height/config.my_dpi, config.fig_width/config.my_dpi), config.my_dpi), player)
+
+# Cell
+def _as_list(x): return [x] if isinstance(x, str) else list(x)
+
+def _filter_mask(dataframe, teams=None, players=None, date_range=None):
+    "Boolean mask of the shots in `dataframe` taken by `teams` or `players` between the dates of `date_range`"
+    mask = np.ones(len(dataframe), dtype=bool)
+    if teams is not None: mask &= dataframe['team'].isin(_as_list(teams)).to_numpy()
+    if players is not None: mask &= dataframe['shots_by'].isin(_as_list(players)).to_numpy()
+    if date_range is not None:
+        keys = _date_key(dataframe)
+        mask &= (keys >= _as_date_key(date_range[0])) & (keys <= _as_date_key(date_range[1]))
+    return mask
+
+def _concat(frames):
+    "Concatenates `frames`, keeping the columns categorical when their categories differ"
+    if len(frames) == 1: return frames[0]
+    dtypes = {c: pd.CategoricalDtype(pd.api.types.union_categoricals([f[c] for f in frames]).categories)
+              for c in frames[0].columns if frames[0][c].dtype.name == 'category'}
+    return pd.concat([f.astype(dtypes) for f in frames], ignore_index=True)
+
+# Cell
+class ShotDataset:
+    "Shots of several `seasons`, loaded lazily with only `columns` and keeping at most `max_bytes` of decoded seasons"
+    def __init__(self, seasons:Optional[Collection[int]]=None, columns:Optional[List[str]]=None, max_bytes:int=2**30):
+        if seasons is None: seasons = sorted(int(k.split('_')[1]) for k in vars(URLs) if k.startswith('SHOTS_'))
+        self.seasons,self.columns,self.max_bytes = list(seasons),columns,max_bytes
+        self._decoded = collections.OrderedDict()
+
+    def path(self, season:int):
+        "Path of the csv of `season`, downloaded if needed"
+        return untar_data(getattr(URLs, f'SHOTS_{season}'))
+
+    def season(self, season:int):
+        "Dataframe of `season`, decoded once and kept while it fits in `max_bytes`"
+        if season in self._decoded:
+            self._decoded.move_to_end(season)
+            return self._decoded[season]
+        df = _read_cache(_season_cache(self.path(season)), self.columns)
+        self._decoded[season] = df
+        while len(self._decoded) > 1 and self.nbytes > self.max_bytes: self._decoded.popitem(last=False)
+        return df
+
+    @property
+    def nbytes(self):
+        "Memory used by the decoded seasons"
+        return sum(int(df.memory_usage(index=False).sum()) for df in self._decoded.values())
+
+    def _select(self, season, columns, **filters):
+        if season in self._decoded:
+            df = self._decoded[season]
+            return df.loc[_filter_mask(df, **filters), columns or df.columns].reset_index(drop=True)
+        cache = _season_cache(self.path(season))
+        rows = np.flatnonzero(_filter_mask(_read_cache(cache, ['team', 'shots_by', 'year', 'month', 'day']), **filters))
+        return _read_cache(cache, columns).take(rows).reset_index(drop=True)
+
+    def select(self, teams=None, players=None, date_range:Optional[tuple]=None, seasons:Optional[Collection[int]]=None,
+               columns:Optional[List[str]]=None):
+        "Shots of `teams` or `players` between the dates of `date_range` in `seasons`, with only `columns`"
+        columns = columns or self.columns
+        frames = [self._select(s, columns, teams=teams, players=players, date_range=date_range) for s in seasons or self.seasons]
+        return _concat(frames)
+
+    def team(self, team:str, **kwargs):
+        "`TeamShots` of `team` over the seasons, see `select` for the options"
+        return TeamShots(self.select(teams=[team], **kwargs), team)
+
+    def player(self, player:str, **kwargs):
+        "`PlayerShots` of `player` over the seasons, see `select` for the options"
+        shots = PlayerShots(self.select(players=[player], **kwargs), player)
+        team = shots.dataframe['team'].iat[0]
+        kwargs['columns'] = ['team']
+        shots.team_total_shots = len(self.select(teams=[team], **kwargs))
+        return shots
+
+# Cell
+def _save_npy(fname, values):
+    "Replaces the `.npy` file `fname` with `values` at once, through a temporary file"
+    fd,tmp = tempfile.mkstemp(dir=str(Path(fname).parent), suffix='.npy')
+    with os.fdopen(fd, 'wb') as f: np.save(f, values)
+    os.replace(tmp, str(fname))
+
+def _append_npy(fname, values, n:Optional[int]=None):
+    "Writes `values` after the first `n` (by default all) values of the 1d `.npy` file `fname`, rewriting the whole file only if its dtype or header can't hold them"
+    with open(fname, 'r+b') as f:
+        version = np.lib.format.read_magic(f)
+        shape,_,dtype = np.lib.format.read_array_header_1_0(f) if version == (1, 0) else ((0,), False, None)
+        offset,start = f.tell(),shape[0] if n is None else n
+        header = "{'descr': %r, 'fortran_order': False, 'shape': (%d,), }" % (np.lib.format.dtype_to_descr(dtype), start+len(values)) if dtype else ''
+        fits = dtype is not None and start <= shape[0] and len(header) < offset - 10 and np.can_cast(values, dtype, casting='same_kind')
+        if fits and dtype.kind in 'iu' and len(values): fits = np.iinfo(dtype).min <= values.min() and values.max() <= np.iinfo(dtype).max
+        if fits:
+            # the header is written last, so a write cut short leaves the file as it was
+            f.seek(offset + start*dtype.itemsize)
+            f.write(np.ascontiguousarray(values, dtype=dtype).tobytes())
+            f.truncate()
+            f.seek(10)
+            f.write((header.ljust(offset - 11) + '\n').encode('latin1'))
+            return
+    old = np.load(fname)
+    _save_npy(fname, np.concatenate([old if n is None else old[:n], values]))
+
+def _cache_values(meta, cache, dataframe):
+    "Values to append to every column file of `cache` for the rows of `dataframe`, with the new categories of the categorical ones"
+    missing = [c['name'] for c in meta['columns'] if c['name'] not in dataframe.columns]
+    if missing: raise ValueError(f"missing columns: {', '.join(missing)}")
+    values = []
+    for i,c in enumerate(meta['columns']):
+        s = dataframe[c['name']]
+        if 'categories' not in c:
+            if not pd.api.types.is_numeric_dtype(s): raise ValueError(f"column {c['name']} is {s.dtype}, expected numbers")
+            values.append((s.to_numpy(), None, None))
+            continue
+        s = s.astype('category')
+        if c['categories'] == 'text': valid = all(isinstance(v, str) for v in s.cat.categories)
+        else: valid = pd.api.types.is_numeric_dtype(s.cat.categories)
+        if not valid: raise ValueError(f"column {c['name']} has {s.cat.categories.dtype} values, expected {'strings' if c['categories'] == 'text' else 'numbers'}")
+        categories = _load_categories(cache/f'{i}.categories.npy', c['categories']).categories
+        lookup = {v:j for j,v in enumerate(categories)}
+        new = [v for v in s.cat.categories if v not in lookup]
+        for v in new: lookup[v] = len(lookup)
+        remap = np.array([lookup[v] for v in s.cat.categories] + [-1])
+        values.append((remap[s.cat.codes.to_numpy()].astype(np.int32), categories, new))
+    return values
+
+def _append_cache(cache, dataframe):
+    "Appends the rows of `dataframe` to the columnar `cache`, extending the category files of its categorical columns"
+    meta = json.loads((cache/'meta.json').read_text())
+    # everything is checked before writing, and the new rows count only once `meta.json` is replaced, last
+    values = _cache_values(meta, cache, dataframe)
+    for i,(c,(v,categories,new)) in enumerate(zip(meta['columns'], values)):
+        fname = cache/f'{i}.categories.npy'
+        if new and c['categories'] == 'text': _append_npy(fname, _text_bytes(([''] if len(categories) else []) + new))
+        elif new: _save_npy(fname, np.concatenate([categories.to_numpy(), new]))
+        _append_npy(cache/f'{i}.npy', v, meta['rows'])
+    _write_meta(cache, {**meta, 'rows': meta['rows'] + len(dataframe)})
+
+# Cell
+class SeasonStore:
+    "Shots of the season csv at `path`, kept in its columnar cache, that new games can be added to with `update`"
+    def __init__(self, path):
+        self.path,self.cache = Path(path),_season_cache(path)
+        self.dataframe = _read_cache(self.cache)
+        self.grids = {}
+
+    @property
+    def game_ids(self): return set(season_index(self.dataframe).games)
+
+    def grid(self, by:Optional[str]=None):
+        "`ShotGrid` of the season per `by` column, kept up to date by `update`"
+        if by not in self.grids: self.grids[by] = ShotGrid.from_df(self.dataframe, by)
+        return self.grids[by]
+
+    def update(self, delta):
+        "Adds the games of `delta` (a csv path or a dataframe) that aren't in the store yet, returns their shots"
+        new = pd.read_csv(delta) if isinstance(delta, (str, Path)) else delta
+        new = new.loc[~new['game_id'].isin(list(self.game_ids))]
+        if len(new) == 0: return new
+        new = _compact_df(normalize_df(new.reset_index(drop=True)))
+        _append_cache(self.cache, new)
+        index = season_index(self.dataframe)
+        index.extend(new)
+        self.dataframe = _read_cache(self.cache)
+        _register_index(self.dataframe, index)
+        for by,grid in self.grids.items(): self.grids[by] = grid + ShotGrid.from_df(new, by)
+        return new
+
+# Cell
+_RENDER_DF = None
+_SAVE_METADATA = {'svg': {'Date': None}}
+
+def _slug(name): return re.sub(r'[^0-9A-Za-z]+', '_', str(name)).strip('_')
+
+def _render_init(dataframe):
+    global _RENDER_DF
+    _RENDER_DF = dataframe
+    matplotlib.rcParams['svg.hashsalt'] = 'shot_chart'
+
+class _NotFound(LookupError):
+    "No shots match the requested team, player, game or dates"
+
+def _select_shots(dataframe, entity:Optional[str], name, date_range:Optional[tuple]=None):
+    "Shots of the team, player or game (`entity`) `name` of `dataframe`, all of them if `entity` is None, optionally only in `date_range`"
+    index = season_index(dataframe)
+    if entity is not None and name not in {'team': index.teams, 'player': index.players, 'game': index.games}[entity]:
+        raise _NotFound(f'unknown {entity}: {name}')
+    if entity == 'team': shots = TeamShots(dataframe, name)
+    elif entity == 'player': shots = PlayerShots(dataframe, name)
+    elif entity == 'game': shots = Shots(_take(dataframe, index.games[name]))
+    else: shots = Shots(dataframe)
+    return shots.between(*date_range) if date_range else shots
+
+def _render_chart(job):
+    kind, entity, name, path, kwargs = job
+    start = time.perf_counter()
+    shots = _select_shots(_RENDER_DF, entity, name)
+    fig = shots.shots_figure(**kwargs) if kind == 'shots' else shots.effective_figure(**kwargs)
+    fmt = Path(path).suffix[1:]
+    with stage('savefig', path=path): fig.savefig(path, format=fmt, metadata=_SAVE_METADATA.get(fmt))
+    return time.perf_counter() - start
+
+# Cell
+def render_charts(dataframe, dest, teams:Collection[str]=(), players:Collection[str]=(), game_ids:Collection[str]=(),
+                  kind:str="shots", fmt:str="png", n_workers:Optional[int]=None, **kwargs):
+    "Writes the `kind` chart (`shots` or `effective`) of every team, player and game to `dest` using `n_workers` processes"
+    dest = Path(dest)
+    dest.mkdir(parents=True, exist_ok=True)
+    jobs = [(kind, entity, name, str(dest/f'{kind}-{entity}-{_slug(name)}.{fmt}'), kwargs)
+            for entity,names in (('team', teams), ('player', players), ('game', game_ids)) for name in names]
+    dataframe = normalize_df(dataframe)
+    court_image() # downloaded once here rather than by every worker
+    if n_workers == 1:
+        _render_init(dataframe)
+        seconds = [_render_chart(job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(n_workers, initializer=_render_init, initargs=(dataframe,)) as ex:
+            seconds = list(ex.map(_render_chart, jobs))
+    return pd.DataFrame([{'kind': j[0], 'entity': j[1], 'name': j[2], 'path': j[3], 'seconds': t} for j,t in zip(jobs, seconds)])
+
+# Cell
+class _LRUCache:
+    "`(content_type, body)` values by key, evicting the least recently used ones when their bodies exceed `max_bytes`"
+    def __init__(self, max_bytes:int):
+        self.max_bytes,self.nbytes,self.hits,self.misses = max_bytes,0,0,0
+        self.items,self.lock = collections.OrderedDict(),threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            value = self.items.get(key)
+            if value is None: self.misses += 1
+            else:
+                self.items.move_to_end(key)
+                self.hits += 1
+            return value
+
+    def put(self, key, value):
+        with self.lock:
+            if key in self.items: self.nbytes -= len(self.items.pop(key)[1])
+            if len(value[1]) > self.max_bytes: return
+            self.items[key] = value
+            self.nbytes += len(value[1])
+            while self.nbytes > self.max_bytes: self.nbytes -= len(self.items.popitem(last=False)[1][1])
+
+def _render_png(job):
+    kind, entity, name, date_range, kwargs = job
+    shots = _select_shots(_RENDER_DF, entity, name, date_range)
+    fig = shots.shots_figure(**kwargs) if kind == 'shots' else shots.effective_figure(**kwargs)
+    buf = BytesIO()
+    fig.savefig(buf, format='png')
+    return buf.getvalue()
+
+def _json_bytes(o): return json.dumps(o, default=lambda v: v.item() if hasattr(v, 'item') else str(v)).encode()
+
+def _shots_metrics(shots):
+    return {**shots.counts, 'fg_pct': shots.fg_pct, 'efg_pct': shots.efg_pct,
+            'zones': shots.court_zone_table().reset_index().to_dict('records'),
+            'distances': shots.zone_table().to_dict('records')}
+
+class _BadRequest(ValueError):
+    "The parameters of the request are invalid"
+
+def _parse_date(s):
+    try:
+        year,month,day = (int(p) for p in s.split('-'))
+        datetime.date(year, month, day)
+    except ValueError: raise _BadRequest(f'invalid date: {s}, expected YYYY-MM-DD')
+    return year,month,day
+
+def _choice(*values):
+    def _f(v):
+        if v not in values: raise _BadRequest(f"invalid value: {v}, expected one of {', '.join(values)}")
+        return v
+    return _f
+
+def _integer(v):
+    try: return int(v)
+    except ValueError: raise _BadRequest(f'invalid value: {v}, expected an integer')
+
+_CHART_KWARGS = {'metric': _choice('fg', 'efg'), 'attempt': _choice('all', '2-pointer', '3-pointer'), 'distance_limit': _integer,
+                 'most_or_least': _choice('most', 'least'), 'min_shots': lambda v: v if v in ('auto', 'none') else _integer(v),
+                 'exclude': lambda v: v.split(',')}
+_ROUTE_KWARGS = {'shots.png': ('metric', 'attempt', 'distance_limit'),
+                 'effective.png': ('metric', 'attempt', 'distance_limit', 'most_or_least', 'min_shots', 'exclude'),
+                 'metrics.json': ()}
+
+def _parse_query(route, query):
+    "Entity, name, date range and chart arguments of the `query` parameters of `route`"
+    unknown = set(query) - {'team', 'player', 'game', 'start', 'end'} - set(_ROUTE_KWARGS[route])
+    if unknown: raise _BadRequest(f"unknown parameters for /{route}: {', '.join(sorted(unknown))}")
+    entities = [e for e in ('team', 'player', 'game') if e in query]
+    if len(entities) > 1: raise _BadRequest('only one of team, player or game can be given')
+    entity = entities[0] if entities else None
+    date_range = None
+    if 'start' in query or 'end' in query:
+        date_range = (_parse_date(query.get('start', '1-1-1')), _parse_date(query.get('end', '9999-12-31')))
+    kwargs = {k: _CHART_KWARGS[k](v) for k,v in query.items() if k in _ROUTE_KWARGS[route]}
+    return entity, query.get(entity), date_range, kwargs
+
+# Cell
+class _ChartHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        url = urlsplit(self.path)
+        try:
+            with stage('request', path=url.path): content_type,body = self.server.query(url.path, parse_qs(url.query))
+            status = 200
+        except _NotFound as e: status,content_type,body = 404,'application/json',_json_bytes({'error': str(e)})
+        except _BadRequest as e: status,content_type,body = 400,'application/json',_json_bytes({'error': str(e)})
+        except Exception as e: status,content_type,body = 500,'application/json',_json_bytes({'error': repr(e)})
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args): logging.getLogger('shot_chart').debug(format, *args)
+
+class ChartServer(ThreadingMixIn, HTTPServer):
+    "Serves PNG charts and JSON metrics of the shots of `dataframe`, kept in memory, on `address`"
+    daemon_threads = True
+    def __init__(self, dataframe, address:Tuple[str,int]=('127.0.0.1', 8000), n_workers:Optional[int]=None, cache_bytes:int=256*2**20):
+        super().__init__(address, _ChartHandler)
+        self.n_workers,self.cache,self.state = n_workers,_LRUCache(cache_bytes),(0, None, None)
+        self._inflight,self._lock = {},threading.Lock()
+        self.update(dataframe)
+
+    def update(self, dataframe):
+        "Serves the shots of `dataframe` from now on, as a new data version"
+        dataframe = normalize_df(dataframe)
+        season_index(dataframe)
+        court_image() # downloaded once here rather than by every worker
+        pool = ProcessPoolExecutor(self.n_workers, initializer=_render_init, initargs=(dataframe,))
+        pool.submit(int).result() # start the workers now rather than from a request thread
+        with self._lock:
+            old = self.state[2]
+            self.state = (self.state[0] + 1, dataframe, pool)
+        if old is not None: old.shutdown(wait=False)
+
+    def status(self):
+        version,dataframe,_ = self.state
+        return {'version': version, 'shots': len(dataframe), 'cache': {'items': len(self.cache.items), 'bytes': self.cache.nbytes,
+                'max_bytes': self.cache.max_bytes, 'hits': self.cache.hits, 'misses': self.cache.misses}}
+
+    def query(self, path:str, params:Dict[str, List[str]]):
+        "Content type and body of the response to `path` with the query `params`"
+        route = path.strip('/')
+        if route == 'status.json': return 'application/json',_json_bytes(self.status())
+        if route not in ('shots.png', 'effective.png', 'metrics.json'): raise _NotFound(f'unknown path: {path}')
+        version,dataframe,pool = self.state
+        query = {k: v[-1] for k,v in params.items()}
+        key = (version, route, tuple(sorted(query.items())))
+        result = self.cache.get(key)
+        if result is not None: return result
+        with self._lock:
+            future,owner = self._inflight.get(key),False
+            if future is None: future,owner = self._inflight.setdefault(key, Future()),True
+        if not owner: return future.result()
+        try:
+            result = self.__compute(route, query, dataframe, pool)
+            self.cache.put(key, result)
+            future.set_result(result)
+            return result
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock: self._inflight.pop(key, None)
+
+    def __compute(self, route, query, dataframe, pool):
+        entity,name,date_range,kwargs = _parse_query(route, query)
+        shots = _select_shots(dataframe, entity, name, date_range)
+        if route == 'metrics.json': return 'application/json',_json_bytes(_shots_metrics(shots))
+        if len(shots.dataframe) == 0: raise _NotFound('no shots for this query')
+        return 'image/png',pool.submit(_render_png, (route[:-len('.png')], entity, name, date_range, kwargs)).result()
+
+    def server_close(self):
+        super().server_close()
+        self.state[2].shutdown()
+
+def serve_charts(dataframe, host:str='127.0.0.1', port:int=8000, **kwargs):
+    "Serves the charts and metrics of `dataframe` on `host`:`port` with a `ChartServer` until interrupted"
+    server = ChartServer(dataframe, (host, port), **kwargs)
+    print(f"Serving charts on http://{host}:{server.server_port}/")
+    try: server.serve_forever()
+    except KeyboardInterrupt: pass
+    finally: server.server_close()
\ No newline at end of file